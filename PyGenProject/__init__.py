@@ -1,2 +1,10 @@
 from . import utils
 from . import core
+
+
+def __getattr__(name):
+    # pygen.compile is imported on first use, since the engine modules import this package
+    if name == "compile":
+        from .core.program import compile
+        return compile
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
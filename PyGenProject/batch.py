@@ -0,0 +1,140 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from core.interpreter import PyGenInterpreter
+from core.vm import VirtualMachine
+from core.cache import ProgramCache
+from core.diagnostics import ErrorCollector, parse_policy
+from PyGenProject.utils.error_codes import ProgramStopped, ProgramError
+from PyGenProject.utils.inputs import StreamInput, IterableInput
+from PyGenProject.utils.output import MemorySink
+
+ENGINES = {"tree": PyGenInterpreter, "vm": VirtualMachine}
+EXTENSIONS = (".pyg", ".edl")
+
+# Exit status of a program in the report
+OK, REPORTED_ERRORS, FAILED = 0, 1, 2
+
+
+def find_programs(patterns):
+    # A directory stands for every .pyg/.edl file below it; anything else is a glob pattern
+    programs = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [path for extension in EXTENSIONS
+                       for path in glob.glob(os.path.join(pattern, "**", "*" + extension), recursive=True)]
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        programs.extend(sorted(matches))
+    return list(dict.fromkeys(programs))
+
+
+def find_input(program, inputs_dir=None):
+    # prog.pyg reads its INPUT values from prog.in, next to it or in inputs_dir
+    name = os.path.splitext(os.path.basename(program))[0] + ".in"
+    path = os.path.join(inputs_dir, name) if inputs_dir else os.path.join(os.path.dirname(program), name)
+    return path if os.path.isfile(path) else None
+
+
+def run_one(job):
+    # Runs one program in a fresh interpreter and returns its report entry
+    program, input_path, engine, cache, max_errors, policy = job
+    output = MemorySink()
+    error_handler = ErrorCollector(output, color=False, policy=policy[0], default=policy[1], max_reports=max_errors)
+    source = IterableInput(()) if input_path is None else StreamInput(input_path)
+    start = time.perf_counter()
+    entry = {"program": program, "input": input_path}
+    try:
+        # Pool workers cannot start processes of their own, so PARFOR runs sequentially here
+        options = {"workers": 1} if engine == "tree" else {}
+        interpreter = ENGINES[engine](output, input_source=source, error_handler=error_handler, **options)
+        error_handler.attach(interpreter)
+        with open(program, encoding="utf-8") as file:
+            text = file.read()
+        error_handler.set_source(text)
+        if cache:
+            compiled = ProgramCache().get(program, text, engine, interpreter.compile_program)
+        else:
+            compiled = interpreter.compile_program(text)
+        interpreter.run_compiled(compiled)
+        entry["status"] = REPORTED_ERRORS if error_handler.diagnostics else OK
+    except (ProgramStopped, ProgramError):
+        entry["status"] = REPORTED_ERRORS  # the policy ended the run; main.py exits with 1 here too
+    except Exception as e:
+        entry["status"] = FAILED
+        entry["exception"] = f"{type(e).__name__}: {e}"
+    entry["seconds"] = round(time.perf_counter() - start, 6)
+    entry["stdout"] = output.getvalue()
+    entry["errors"] = error_handler.summary()
+    return entry
+
+
+class BatchRunner:
+    def __init__(self, workers=None, chunksize=1, engine="tree", cache=True, inputs_dir=None, max_errors=None,
+                 policy=None, default="continue"):
+        # max_errors, policy and default configure every program's ErrorCollector
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.engine = engine
+        self.cache = cache
+        self.inputs_dir = inputs_dir
+        self.max_errors = max_errors
+        self.policy = (dict(policy or {}), default)
+
+    def jobs(self, programs):
+        return [(program, find_input(program, self.inputs_dir), self.engine, self.cache, self.max_errors, self.policy)
+                for program in programs]
+
+    def run(self, programs):
+        # Yields report entries in program order while the pool works ahead
+        jobs = self.jobs(programs)
+        if self.workers == 1:
+            yield from map(run_one, jobs)
+            return
+        with Pool(self.workers) as pool:
+            yield from pool.imap(run_one, jobs, self.chunksize)
+
+    def write_report(self, programs, report):
+        # Writes one JSON object per program and returns the number of programs per exit status
+        totals = {OK: 0, REPORTED_ERRORS: 0, FAILED: 0}
+        for entry in self.run(programs):
+            report.write(json.dumps(entry) + "\n")
+            totals[entry["status"]] += 1
+        return totals
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Run many PyGen programs in parallel.")
+    arg_parser.add_argument("programs", nargs="+", help="program files, directories or glob patterns")
+    arg_parser.add_argument("--report", default="-", help="JSONL report file ('-' for stdout)")
+    arg_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    arg_parser.add_argument("--chunksize", type=int, default=1, help="programs handed to a worker at a time")
+    arg_parser.add_argument("--engine", choices=sorted(ENGINES), default="tree")
+    arg_parser.add_argument("--inputs", metavar="DIR",
+                            help="directory with a <name>.in input file per program (default: next to it)")
+    arg_parser.add_argument("--no-cache", action="store_true", help="do not use the __pygcache__ directories")
+    arg_parser.add_argument("--max-errors", type=int, metavar="N", help="print at most N distinct errors per program")
+    arg_parser.add_argument("--on-error", action="append", default=[], metavar="[CLASS=]ACTION",
+                            help="continue, stop or raise on errors of CLASS, or on all errors; may be repeated")
+    args = arg_parser.parse_args()
+    try:
+        policy, default = parse_policy(args.on_error)
+    except ValueError as error:
+        arg_parser.error(f"--on-error: {error}")
+
+    runner = BatchRunner(args.workers, args.chunksize, args.engine, not args.no_cache, args.inputs, args.max_errors,
+                         policy, default)
+    programs = find_programs(args.programs)
+    if args.report == "-":
+        totals = runner.write_report(programs, sys.stdout)
+    else:
+        with open(args.report, "w", encoding="utf-8") as report:
+            totals = runner.write_report(programs, report)
+    print(f"{len(programs)} programs: {totals[OK]} ok, {totals[REPORTED_ERRORS]} with errors, "
+          f"{totals[FAILED]} failed", file=sys.stderr)
+    sys.exit(0 if totals[FAILED] == 0 else 1)
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+
+from interpreter import PyGenInterpreter  # noqa: E402
+from arrays import load_numpy  # noqa: E402
+from PyGenProject.utils.output import MemorySink  # noqa: E402
+
+# The same computation, sum((a[i] * 3 + 1) mod 7) over n elements, per element and element-wise
+WORKLOADS = {
+    "per-element": """
+ARRAY a {n} 0
+SET seven 7
+SET s 0
+FOR i FROM 0 TO {last} DO
+    PUT a i i
+ENDFOR
+FOR i FROM 0 TO {last} DO
+    GET v a i
+    MUL v 3
+    ADD v 1
+    CLC v v MOD seven
+    ADD s v
+ENDFOR
+PRINT s
+""",
+    "element-wise": """
+ARRAY a {n} 0
+FOR i FROM 0 TO {last} DO
+    PUT a i i
+ENDFOR
+SET b a
+MUL b 3
+ADD b 1
+MOD b 7
+SUM s b
+PRINT s
+""",
+}
+
+
+def run(source):
+    output = MemorySink()
+    PyGenInterpreter(output, workers=1).run_program(source)
+    return output.lines
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Per-element PyGen loops against element-wise array operations.")
+    arg_parser.add_argument("--size", type=int, default=200000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    print(f"{args.size} elements, {'NumPy' if load_numpy() is not None else 'array.array'} buffers")
+    results = {}
+    for workload, template in WORKLOADS.items():
+        source = template.format(n=args.size, last=args.size - 1)
+        results[workload] = run(source)
+        seconds = min(timeit.repeat(lambda: run(source), number=1, repeat=args.repeat))
+        print(f"  {workload:<13} {seconds:8.3f}s")
+    if len(set(map(tuple, results.values()))) != 1:
+        print(f"  results differ: {results}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
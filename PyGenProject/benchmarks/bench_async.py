@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+
+from async_interpreter import AsyncPyGenInterpreter  # noqa: E402
+from PyGenProject.utils.inputs import QueueInput  # noqa: E402
+from PyGenProject.utils.output import AsyncSink  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# One interactive session: reads a value per round, then runs a loop that has to yield to the event loop
+SESSION = """
+SET seven 7
+SET total 0
+FOR round FROM 1 TO {rounds} DO
+    INPUT x
+    SET i 0
+    WHILE i < {work} DO
+        ADD i 1
+        CLC t i MOD seven
+        ADD total t
+    ENDWHILE
+    ADD total x
+    PRINT "round" round "total" total
+ENDFOR
+"""
+
+
+class CountingSink(AsyncSink):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    async def deliver(self, lines):
+        self.count += len(lines)
+
+
+async def client(queue, rounds, think):
+    # Plays the user of one session: answers every INPUT after `think` seconds
+    for value in range(rounds):
+        await asyncio.sleep(think)
+        await queue.put(str(value))
+
+
+async def run_sessions(sessions, source, rounds, think, yield_every):
+    sinks = []
+    tasks = []
+    for _ in range(sessions):
+        queue = asyncio.Queue()
+        sink = CountingSink()
+        sinks.append(sink)
+        interpreter = AsyncPyGenInterpreter(sink, input_source=QueueInput(queue, prompt=False),
+                                            yield_every=yield_every)
+        tasks.append(interpreter.run(source))
+        tasks.append(client(queue, rounds, think))
+    await asyncio.gather(*tasks)
+    return sum(sink.count for sink in sinks)
+
+
+def peak_rss():
+    # Peak resident set size of this process in MB, or None where it cannot be read
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Load test: concurrent sessions on one AsyncPyGenInterpreter event loop.")
+    arg_parser.add_argument("--sessions", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    arg_parser.add_argument("--rounds", type=int, default=5, help="INPUT/loop rounds per session")
+    arg_parser.add_argument("--work", type=int, default=200, help="WHILE iterations per round")
+    arg_parser.add_argument("--think", type=float, default=0.01, help="seconds a client waits before answering")
+    arg_parser.add_argument("--yield-every", type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    source = SESSION.format(rounds=args.rounds, work=args.work)
+    print(f"{'sessions':>8} {'seconds':>9} {'sessions/s':>11} {'statements/s':>13} {'peak MB':>8}")
+    for sessions in args.sessions:
+        start = time.perf_counter()
+        lines = asyncio.run(run_sessions(sessions, source, args.rounds, args.think, args.yield_every))
+        seconds = time.perf_counter() - start
+        if lines != sessions * args.rounds:
+            print(f"{sessions} sessions printed {lines} lines, expected {sessions * args.rounds}")
+            sys.exit(1)
+        statements = sessions * (args.rounds * (args.work * 3 + 5) + 2)
+        rss = peak_rss()
+        print(f"{sessions:>8} {seconds:>9.3f} {sessions / seconds:>11,.0f} {statements / seconds:>13,.0f}"
+              f" {'-' if rss is None else f'{rss:.1f}':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+
+from interpreter import PyGenInterpreter  # noqa: E402
+from vm import VirtualMachine  # noqa: E402
+from program import CompiledProgram  # noqa: E402
+from PyGenProject.utils.inputs import IterableInput  # noqa: E402
+from PyGenProject.utils.output import MemorySink  # noqa: E402
+
+# A short scoring script, the kind that is run once per record
+SOURCE = """
+INPUT amount
+INPUT days
+SET score 0
+IF amount > limit THEN
+    ADD score 40
+ELIF amount > 100 THEN
+    ADD score 10
+ENDIF
+SET i 0
+WHILE i < days DO
+    ADD i 1
+    CLC part amount MOD i
+    ADD score part
+ENDWHILE
+CLC score score MUL weight
+PRINT "score" score
+"""
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Per-run cost of a compiled program against a fresh interpreter per run.")
+    arg_parser.add_argument("--runs", type=int, default=20000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    program = CompiledProgram(SOURCE)
+    bindings = {"limit": 500, "weight": 2}
+    inputs = [750, 5]
+
+    def fresh(engine):
+        def run():
+            output = MemorySink()
+            interpreter = engine(output, color=False, input_source=IterableInput(inputs))
+            interpreter.command.variables.update(bindings)
+            interpreter.run_program(SOURCE)
+        return run
+
+    def compiled():
+        program.run(bindings, inputs, MemorySink(), color=False)
+
+    def execute_only():
+        # The statements alone, in a context built beforehand
+        context = contexts.pop()
+        program.vm.execute(program.code, program.consts, context)
+
+    cases = {"tree, fresh": fresh(PyGenInterpreter), "vm, fresh": fresh(VirtualMachine),
+             "compiled": compiled, "execute only": execute_only}
+    times = {}
+    for name, run in cases.items():
+        best = None
+        for _ in range(args.repeat):
+            contexts = [program.context(bindings, inputs, MemorySink(), color=False) for _ in range(args.runs)]
+            seconds = timeit.timeit(run, number=args.runs)
+            best = seconds if best is None else min(best, seconds)
+        times[name] = best
+    print(f"{args.runs} runs")
+    for name, seconds in times.items():
+        print(f"  {name:<13} {seconds / args.runs * 1e6:8.1f}us/run  x{seconds / times['execute only']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
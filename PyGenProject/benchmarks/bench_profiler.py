@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+
+from interpreter import PyGenInterpreter  # noqa: E402
+from profiler import Profiler  # noqa: E402
+from PyGenProject.utils.output import MemorySink  # noqa: E402
+
+WORKLOADS = {
+    "while-arithmetic": """
+SET seven 7
+SET i 0
+SET s 0
+WHILE i < {n} DO
+    ADD i 1
+    CLC t i MOD seven
+    ADD s t
+ENDWHILE
+""",
+    "for-branches": """
+SET three 3
+SET s 0
+FOR i FROM 1 TO {n} DO
+    CLC r i MOD three
+    IF r == 0 THEN
+        ADD s 1
+    ELIF r == 1 THEN
+        SUB s 1
+    ELSE
+        MUL s 1
+    ENDIF
+ENDFOR
+""",
+}
+
+
+def run(source, mode):
+    interpreter = PyGenInterpreter(MemorySink(), workers=1)
+    if mode != "off":
+        profiler = Profiler().attach(interpreter)
+        if mode == "detached":
+            profiler.detach()
+    interpreter.run_program(source)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Cost of the profiler hooks, attached and not attached.")
+    arg_parser.add_argument("--iterations", type=int, default=50000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    for workload, template in WORKLOADS.items():
+        source = template.format(n=args.iterations)
+        run(source, "off")  # warm-up
+        times = {mode: min(timeit.repeat(lambda: run(source, mode), number=1, repeat=args.repeat))
+                 for mode in ("off", "detached", "profiled")}
+        print(f"{workload}: {args.iterations} iterations")
+        for mode, seconds in times.items():
+            print(f"  {mode:<10} {seconds:8.3f}s  x{seconds / times['off']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+
+from interpreter import PyGenInterpreter  # noqa: E402
+from stream import SourceReader, SourceStream  # noqa: E402
+from PyGenProject.utils.output import MemorySink  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def generate(path, lines):
+    # Straight-line generated code with a small loop now and then, like the output of a code generator
+    with open(path, "w") as file:
+        file.write("SET acc 0\nSET seven 7\n")
+        for index in range(lines // 2):
+            file.write(f"SET v{index % 500} {index}\nADD acc v{index % 500}\n")
+            if index % 5000 == 0:
+                file.write("FOR i FROM 1 TO 10 DO\n    CLC t i MOD seven\n    ADD acc t\nENDFOR\nPRINT acc\n")
+
+
+def child(mode, path):
+    # Runs in its own process, so that the peak RSS belongs to one mode only
+    output = MemorySink()
+    interpreter = PyGenInterpreter(output, color=False, workers=1)
+    start = time.perf_counter()
+    if mode == "whole":
+        with open(path) as file:
+            interpreter.run_program(file.read())
+    else:
+        interpreter.run_stream(SourceStream(SourceReader(path), interpreter.parser))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource is not None else float("nan")
+    print(f"{seconds:.3f} {peak:.1f} {output.lines[-1] if output.lines else ''}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Peak memory of loading a program whole against streaming it.")
+    arg_parser.add_argument("--lines", type=int, default=200000)
+    arg_parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "generated.pyg")
+        generate(path, args.lines)
+        print(f"{args.lines} lines, {os.path.getsize(path) / 2 ** 20:.1f} MiB")
+        results = {}
+        for mode in ("whole", "stream"):
+            result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, path],
+                                    capture_output=True, text=True, check=True)
+            seconds, peak, last = result.stdout.split(maxsplit=2)
+            results[mode] = last
+            print(f"  {mode:<7} {float(seconds):8.3f}s  peak RSS {float(peak):8.1f} MiB")
+        if results["whole"] != results["stream"]:
+            print(f"  results differ: {results}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+
+from tokenizer import Tokenizer  # noqa: E402
+
+
+class LegacyTokenizer:
+    # The character-by-character tokenizer that Tokenizer.tokenize_source replaced, kept as the baseline
+    KEYWORDS = Tokenizer.KEYWORDS
+    OPERATORS = Tokenizer.OPERATORS
+
+    def tokenize(self, line):
+        if "//" in line:
+            line = line.split("//", 1)[0]
+        tokens = []
+        current = ""
+        in_string = False
+        i = 0
+        while i < len(line):
+            char = line[i]
+            if char == '"':
+                if in_string:
+                    current += char
+                    tokens.append(current)
+                    current = ""
+                    in_string = False
+                else:
+                    if current:
+                        tokens.append(current)
+                        current = ""
+                    current = char
+                    in_string = True
+                i += 1
+                continue
+            if in_string:
+                current += char
+                i += 1
+                continue
+            two_char = line[i:i + 2]
+            if two_char in self.OPERATORS:
+                if current:
+                    tokens.append(current)
+                    current = ""
+                tokens.append(two_char)
+                i += 2
+                continue
+            if char in "<>":
+                if current:
+                    tokens.append(current)
+                    current = ""
+                tokens.append(char)
+                i += 1
+                continue
+            if char.isspace():
+                if current:
+                    tokens.append(current)
+                    current = ""
+                i += 1
+                continue
+            current += char
+            i += 1
+        if current:
+            tokens.append(current)
+        final_tokens = []
+        for token in tokens:
+            if token.startswith('"'):
+                final_tokens.append(token)
+            else:
+                upper = token.upper()
+                if upper in self.KEYWORDS:
+                    final_tokens.append(upper)
+                else:
+                    final_tokens.append(token)
+        return final_tokens
+
+
+WORKLOADS = {
+    "short-names": [f"v{i}" for i in range(50)],
+    "long-names": [f"{kind}_{part}_{i}" for i, (kind, part) in enumerate(
+        zip(["total", "count", "index", "value", "result"] * 10, ["sum", "acc", "tmp", "max", "min"] * 10))],
+}
+
+
+def generate_program(line_count, names, seed=1):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(line_count):
+        roll = rng.random()
+        a, b = rng.choice(names), rng.choice(names)
+        if roll < 0.3:
+            lines.append(f"SET {a} {rng.randint(0, 99999)}")
+        elif roll < 0.55:
+            lines.append(f"ADD {a} {b}")
+        elif roll < 0.7:
+            lines.append(f'PRINT "Current value of {a} is" {a}')
+        elif roll < 0.8:
+            lines.append(f"CLC {a} {b} MUL {a}")
+        elif roll < 0.85:
+            lines.append(f"IF {a} >= {b} THEN")
+        elif roll < 0.9:
+            lines.append("ENDIF")
+        elif roll < 0.95:
+            lines.append(f"    // step {i}: update {a}")
+        else:
+            lines.append("")
+    return "\n".join(lines)
+
+
+def best_of(func, repeat):
+    # timeit runs with the garbage collector disabled, for every contender alike
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Tokenizer throughput microbenchmark.")
+    arg_parser.add_argument("--lines", type=int, default=200000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    legacy = LegacyTokenizer()
+    tokenizer = Tokenizer()
+    for workload, names in WORKLOADS.items():
+        source = generate_program(args.lines, names)
+        lines = source.split("\n")
+        expected = [(number, parts) for number, parts in
+                    ((number, legacy.tokenize(line)) for number, line in enumerate(lines, 1)) if parts]
+        if tokenizer.tokenize_source(source) != expected:
+            raise SystemExit(f"{workload}: tokenize_source disagrees with the legacy tokenizer")
+
+        legacy_time = best_of(lambda: [legacy.tokenize(line) for line in lines], args.repeat)
+        source_time = best_of(lambda: tokenizer.tokenize_source(source), args.repeat)
+        megabytes = len(source) / 1e6
+        print(f"{workload}: {args.lines} lines, {megabytes:.1f} MB")
+        for label, seconds in (("legacy per-line tokenize", legacy_time),
+                               ("tokenize_source (whole file)", source_time)):
+            print(f"  {label:<30} {seconds:8.3f}s  {args.lines / seconds:>12,.0f} lines/s"
+                  f"  {megabytes / seconds:7.1f} MB/s  x{legacy_time / seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+
+from PyGenProject.utils.error_codes import GetError  # noqa: E402,F401  (imported first to avoid a cycle)
+from interpreter import PyGenInterpreter  # noqa: E402
+from vm import VirtualMachine  # noqa: E402
+from tokenizer import Tokenizer  # noqa: E402
+from PyGenProject.utils.inputs import StreamInput  # noqa: E402
+from PyGenProject.utils.output import FileSink, MemorySink  # noqa: E402
+from bench_tokenizer import generate_program, WORKLOADS as NAME_SETS  # noqa: E402
+
+ENGINES = {"tree": PyGenInterpreter, "vm": VirtualMachine}
+
+# Canonical programs; {n} is the iteration count. Each loop includes a statement the closed-form
+# reducer does not handle, so the interpreter's own hot path is what gets measured.
+PROGRAMS = {
+    "while-arithmetic": """
+SET i 0
+SET s 0
+WHILE i < {n} DO
+    ADD i 1
+    ADD s i
+    SUB s 3
+    MUL s 1
+    MOD s 1000003
+ENDWHILE
+""",
+    "if-elif-chain": """
+SET hits 0
+FOR i FROM 1 TO {n} DO
+    CLC r i MOD five
+    IF r == 0 THEN
+        ADD hits 1
+    ELIF r == 1 THEN
+        ADD hits 2
+    ELIF r == 2 THEN
+        ADD hits 3
+    ELIF r == 3 THEN
+        ADD hits 4
+    ELSE
+        SUB hits 1
+    ENDIF
+ENDFOR
+""",
+    "conditions": """
+SET i 0
+SET flag TRUE
+SET limit 10
+SET count 0
+WHILE i < {n} AND flag == TRUE OR i < 0 DO
+    ADD i 1
+    IF NOT i < limit AND i != 7 OR i == 3 THEN
+        ADD count 1
+    ENDIF
+ENDWHILE
+""",
+    "clc-chain": """
+SET two 2
+SET a 0
+FOR i FROM 1 TO {n} DO
+    CLC a i MUL two
+    CLC b a ADD i
+    CLC c b SUB two
+    CLC d c DIV two
+    CLC e d MOD two
+ENDFOR
+""",
+    "print-heavy": """
+SET s 0
+FOR i FROM 1 TO {n} DO
+    ADD s i
+    PRINT "iteration" i "total" s
+ENDFOR
+""",
+    "input-heavy": """
+SET s 0
+FOR i FROM 1 TO {n} DO
+    INPUT x
+    ADD s x
+ENDFOR
+""",
+}
+
+# Iterations of every workload; the tokenizer workload counts source lines
+SIZES = {"tokenizer": 200000, "while-arithmetic": 50000, "if-elif-chain": 30000, "conditions": 30000,
+         "clc-chain": 30000, "print-heavy": 30000, "input-heavy": 30000}
+
+
+def make_workload(name, size, engine):
+    # Returns a zero-argument callable that runs the workload once
+    if name == "tokenizer":
+        source = generate_program(size, NAME_SETS["short-names"])
+        tokenizer = Tokenizer()
+        return lambda: tokenizer.tokenize_source(source)
+    source = PROGRAMS[name].format(n=size)
+    if name == "if-elif-chain":
+        source = "SET five 5\n" + source
+    interpreter_class = ENGINES[engine]
+    options = {"workers": 1} if engine == "tree" else {}
+    if name == "print-heavy":
+        def run():
+            sink = FileSink(os.devnull)
+            interpreter_class(sink, **options).run_program(source)
+            sink.close()
+        return run
+    if name == "input-heavy":
+        data = "\n".join(str(value) for value in range(size))
+        return lambda: interpreter_class(MemorySink(), input_source=StreamInput(io.StringIO(data)),
+                                         **options).run_program(source)
+    return lambda: interpreter_class(MemorySink(), **options).run_program(source)
+
+
+def measure(func, warmup, repeat):
+    for _ in range(warmup):
+        func()
+    # timeit runs with the garbage collector disabled
+    return timeit.repeat(func, number=1, repeat=repeat)
+
+
+def run_suite(names, engine, warmup, repeat, scale):
+    results = {}
+    for name in names:
+        size = max(1, int(SIZES[name] * scale))
+        times = measure(make_workload(name, size, engine), warmup, repeat)
+        best = min(times)
+        results[name] = {"ops": size, "best": best, "median": statistics.median(times),
+                         "ops_per_sec": size / best}
+        print(f"{name:<18} {size:>8} ops  best {best:8.4f}s  median {statistics.median(times):8.4f}s"
+              f"  {size / best:>12,.0f} ops/s")
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Returns the workloads whose ops/sec fell by more than `threshold` (a fraction) below the baseline
+    regressions = []
+    print(f"\n{'workload':<18} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<18} {'-':>14} {result['ops_per_sec']:>14,.0f}")
+            continue
+        change = result["ops_per_sec"] / previous["ops_per_sec"] - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<18} {previous['ops_per_sec']:>14,.0f} {result['ops_per_sec']:>14,.0f} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="PyGen benchmark suite.")
+    arg_parser.add_argument("workloads", nargs="*", help=f"workloads to run (default: all of {', '.join(SIZES)})")
+    arg_parser.add_argument("--engine", choices=sorted(ENGINES), default="tree")
+    arg_parser.add_argument("--warmup", type=int, default=1)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--scale", type=float, default=1.0, help="multiplies every workload size")
+    arg_parser.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    arg_parser.add_argument("--baseline", metavar="FILE", help="compare against results saved with --output")
+    arg_parser.add_argument("--threshold", type=float, default=0.10,
+                            help="allowed slowdown against the baseline, as a fraction (default 0.10)")
+    args = arg_parser.parse_args()
+
+    names = args.workloads or list(SIZES)
+    unknown = [name for name in names if name not in SIZES]
+    if unknown:
+        arg_parser.error(f"unknown workloads: {', '.join(unknown)}")
+    results = run_suite(names, args.engine, args.warmup, args.repeat, args.scale)
+
+    if args.output:
+        report = {"engine": args.engine, "python": platform.python_version(), "platform": platform.platform(),
+                  "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "warmup": args.warmup, "repeat": args.repeat,
+                  "results": results}
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,16 @@
+from . import frame
 from . import commands
 from . import tokenizer
+from . import cache
+from . import conditions
+from . import reductions
+from . import nodes
+from . import parser
+from . import resolver
 from . import interpreter
+from . import parallel
+from . import profiler
+from . import opcodes
+from . import compiler
+from . import vm
+from . import disassembler
@@ -0,0 +1,180 @@
+import math
+import operator
+from array import array
+from itertools import repeat
+
+FUNCTIONS = {"ADD": operator.add, "SUB": operator.sub, "MUL": operator.mul,
+             "DIV": operator.truediv, "MOD": operator.mod}
+INT_LIMIT = 2 ** 63  # int elements are signed 64-bit words
+NOT_LOADED = object()
+numpy = NOT_LOADED  # imported by load_numpy() when the first array is created
+
+
+def load_numpy():
+    # None when NumPy is not installed, and array.array buffers are used instead
+    global numpy
+    if numpy is NOT_LOADED:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        numpy = module
+    return numpy
+
+
+class Array:
+    # A fixed-length PyGen array of ints or floats, one machine word per element: an array.array
+    # ('q' or 'd'), or a NumPy int64/float64 buffer when NumPy is installed. Variables hold
+    # references, so after `SET b a` a PUT through either name is seen through both, while the
+    # element-wise operations always produce a new array.
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __str__(self):
+        return str(self.data.tolist())
+
+    def __repr__(self):
+        return f"Array({self.data.tolist()!r})"
+
+    def __sizeof__(self):
+        data = self.data
+        size = len(data) * data.itemsize if isinstance(data, array) else data.nbytes
+        return object.__sizeof__(self) + size
+
+    def is_float(self):
+        data = self.data
+        return data.typecode == "d" if isinstance(data, array) else data.dtype.kind == "f"
+
+
+def is_number(value):
+    return isinstance(value, (int, float))
+
+
+def new(size, init, error):
+    if not isinstance(size, int) or isinstance(size, bool) or size < 0 or not is_number(init):
+        error("E026")
+        return None
+    is_float = isinstance(init, float)
+    try:
+        if load_numpy() is not None:
+            return Array(numpy.full(size, init, dtype=numpy.float64 if is_float else numpy.int64))
+        return Array(array("d" if is_float else "q", [init]) * size)
+    except (OverflowError, MemoryError):
+        error("E026")
+        return None
+
+
+def check_index(target, index, name, error):
+    if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(target.data):
+        error("E027", index=index, var=name)
+        return False
+    return True
+
+
+def get(target, index, name, error):
+    if not check_index(target, index, name, error):
+        return None
+    data = target.data
+    return data[index] if isinstance(data, array) else data.item(index)
+
+
+def put(target, index, value, name, error):
+    if not check_index(target, index, name, error):
+        return
+    if not is_number(value) or (isinstance(value, float) and not target.is_float()):
+        error("E030", val=value, var=name)
+        return
+    try:
+        if not target.is_float() and not -INT_LIMIT <= value < INT_LIMIT:
+            raise OverflowError
+        target.data[index] = value
+    except OverflowError:
+        error("E030", val=value, var=name)
+
+
+def reduce(cmd, target, error):
+    # SUM is exact for ints and exactly rounded (math.fsum) for floats, so both buffers agree
+    data = target.data
+    is_float = target.is_float()
+    if cmd == "SUM":
+        if isinstance(data, array):
+            return math.fsum(data) if is_float else sum(data)
+        if is_float:
+            return math.fsum(data.tolist())
+        if len(data) and len(data) * max(abs(int(data.min())), abs(int(data.max()))) >= INT_LIMIT:
+            return sum(data.tolist())  # int64 would wrap around
+        return int(data.sum())
+    if not len(data):
+        error("E032", cmd=cmd)
+        return None
+    if isinstance(data, array):
+        return min(data) if cmd == "MIN" else max(data)
+    return (data.min() if cmd == "MIN" else data.max()).item()
+
+
+def combine(cmd, left, right, error):
+    # Element-wise `left <cmd> right`, where at least one operand is an Array and the other is an
+    # Array or a number; None once an error is reported
+    arrays = [operand for operand in (left, right) if isinstance(operand, Array)]
+    size = len(arrays[0].data)
+    if any(len(operand.data) != size for operand in arrays):
+        error("E029", cmd=cmd)
+        return None
+    is_float = cmd == "DIV" or any(operand.is_float() if isinstance(operand, Array) else isinstance(operand, float)
+                                   for operand in (left, right))
+    if not isinstance(arrays[0].data, array):
+        load_numpy()  # already imported, unless the Array was built outside new()
+        return combine_numpy(cmd, left, right, is_float, error)
+    a = left.data if isinstance(left, Array) else repeat(left, size)
+    b = right.data if isinstance(right, Array) else repeat(right, size)
+    try:
+        return Array(array("d" if is_float else "q", map(FUNCTIONS[cmd], a, b)))
+    except ZeroDivisionError:
+        error("E004")
+    except OverflowError:
+        error("E031", cmd=cmd)
+    return None
+
+
+def combine_numpy(cmd, left, right, is_float, error):
+    a = left.data if isinstance(left, Array) else left
+    b = right.data if isinstance(right, Array) else right
+    if cmd in ("DIV", "MOD") and numpy.any(numpy.asarray(b) == 0):
+        error("E004")
+        return None
+    try:
+        with numpy.errstate(all="ignore"):
+            if is_float:
+                a = numpy.asarray(a, dtype=numpy.float64)
+                b = numpy.asarray(b, dtype=numpy.float64)
+            else:
+                a = numpy.asarray(a, dtype=numpy.int64)
+                b = numpy.asarray(b, dtype=numpy.int64)
+            result = {"ADD": numpy.add, "SUB": numpy.subtract, "MUL": numpy.multiply,
+                      "DIV": numpy.true_divide, "MOD": numpy.remainder}[cmd](a, b)
+            if not is_float and overflowed(cmd, a, b, result):
+                raise OverflowError
+    except OverflowError:
+        error("E031", cmd=cmd)
+        return None
+    return Array(result)
+
+
+def overflowed(cmd, a, b, result):
+    # int64 arithmetic wraps around silently, where array.array raises OverflowError
+    if cmd == "ADD":
+        return bool(numpy.any((a ^ result) & (b ^ result) < 0))
+    if cmd == "SUB":
+        return bool(numpy.any((a ^ b) & (a ^ result) < 0))
+    if cmd == "MUL":
+        # Exact: dividing the wrapped product by a non-zero factor gives back the other factor only
+        # if nothing was lost. -2**63 * -1 is the one overflow whose quotient wraps back to a.
+        lost = (result // numpy.where(b == 0, 1, b) != a) & (b != 0)
+        return bool(numpy.any(lost | ((a == -INT_LIMIT) & (b == -1))))
+    return False
+
@@ -0,0 +1,126 @@
+import asyncio
+import inspect
+
+from PyGenProject.utils.error_codes import BudgetExceeded, ProgramStopped
+from PyGenProject.utils.inputs import InputExhausted
+from PyGenProject.utils.output import AsyncStdoutSink
+from interpreter import PyGenInterpreter
+from nodes import Statement, IfNode, WhileNode, ForNode, ParForNode
+
+
+class AsyncPyGenInterpreter(PyGenInterpreter):
+    # Runs a program as a coroutine, so one event loop can serve many sessions. INPUT awaits the
+    # input source, output is drained to an AsyncSink, and the program yields to the event loop
+    # every `yield_every` statements. PARFOR runs sequentially, like FOR.
+    def __init__(self, output=None, color=True, input_source=None, error_handler=None, yield_every=1000):
+        super().__init__(output or AsyncStdoutSink(), color, input_source, error_handler, workers=1)
+        self.yield_every = yield_every
+        self.steps = 0
+        self.async_dispatch = {
+            Statement: self.run_statement,
+            IfNode: self.run_if,
+            WhileNode: self.run_while,
+            ForNode: self.run_for,
+            ParForNode: self.run_for,
+        }
+
+    async def run(self, source):
+        tree = self.resolver.resolve(self.compile_program(source))
+        try:
+            await self.run_block(tree)
+        except BudgetExceeded as exceeded:
+            self.report_exceeded(exceeded)
+        except ProgramStopped:
+            pass
+        finally:
+            await self.output.drain()
+
+    async def pause(self):
+        # Called every `yield_every` statements: hands pending output over and lets other sessions run
+        self.steps = 0
+        await self.output.drain()
+        await asyncio.sleep(0)
+
+    async def run_block(self, block):
+        dispatch = self.async_dispatch
+        for node in block:
+            self.steps += 1
+            if self.steps >= self.yield_every:
+                await self.pause()
+            execute = dispatch.get(type(node))
+            if execute is None:
+                self.dispatch[type(node)](node)
+            else:
+                await execute(node)
+
+    async def run_statement(self, node):
+        if node.op == "input_value":
+            await self.run_input(*node.args)
+        else:
+            self.command.handlers[node.op](*node.args)
+
+    async def run_input(self, target):
+        command = self.command
+        name = command.frame.names[target]
+        source = command.input_source
+        if getattr(source, "prompt", False) and not source.interactive:  # the console prompts by itself
+            self.output.write_line(f"{name} = ")
+        await self.output.drain()
+        try:
+            value = source.read(name, command.detect_type)
+            if inspect.isawaitable(value):
+                value = await value
+        except (KeyboardInterrupt, InputExhausted):
+            command.error_handler.get_error("E005", var=name)
+            return
+        command.frame.values[target] = value
+
+    async def run_if(self, node):
+        values = self.command.frame.values
+        error = self.command.error_handler.get_error
+        for evaluate, (_, block) in zip(node.evaluators, node.branches):
+            if evaluate is None:
+                self.error_handler.get_error("E014")  # ELIF without THEN
+                continue
+            if evaluate(values, error):
+                await self.run_block(block)
+                return
+        if node.else_block:
+            await self.run_block(node.else_block)
+
+    async def run_for(self, node):
+        start_val, end_val, step_val = node.start, node.end, node.step
+        if not all(isinstance(val, (int, float)) for val in [start_val, end_val, step_val]):
+            self.error_handler.get_error("E019")
+            return
+        slot = node.slot
+        values = self.command.frame.values
+        if node.reduction is not None and node.reduction.run(values):
+            return
+        if node.counted:
+            stop = end_val + 1 if step_val > 0 else end_val - 1
+            value = None
+            for value in range(start_val, stop, step_val):
+                values[slot] = value
+                await self.run_block(node.block)
+            values[slot] = start_val if value is None else value + step_val
+            return
+        values[slot] = start_val
+        while ((step_val > 0 and values[slot] <= end_val) or
+               (step_val < 0 and values[slot] >= end_val)):
+            await self.run_block(node.block)
+            values[slot] += step_val
+
+    async def run_while(self, node):
+        evaluate = node.evaluate
+        values = self.command.frame.values
+        if node.reduction is not None and node.reduction.run(values):
+            return
+        error = self.command.error_handler.get_error
+        while evaluate(values, error):
+            await self.run_block(node.block)
+            # An empty body never reaches run_block's counter, so the loop counts itself
+            if not node.block:
+                self.steps += 1
+                if self.steps >= self.yield_every:
+                    await self.pause()
@@ -0,0 +1,159 @@
+import sys
+from time import monotonic
+
+from PyGenProject.utils.error_codes import BudgetExceeded
+from nodes import WhileNode, ForNode, ParForNode
+from profiler import restore
+
+UNLIMITED = float("inf")
+
+
+class Budget:
+    # Execution limits for untrusted programs: statements run, loop iterations, wall-clock seconds
+    # and bytes held by variables. Like the Profiler, attach() swaps counting wrappers into an
+    # interpreter, so one without a budget runs no extra code. Work is charged once per executed
+    # block; the clock and memory are looked at every `check_every` blocks. The run stops with E025.
+    LOOPS = (WhileNode, ForNode, ParForNode)
+
+    def __init__(self, max_statements=None, max_iterations=None, timeout=None, max_memory=None, check_every=64):
+        self.max_statements = UNLIMITED if max_statements is None else max_statements
+        self.max_iterations = UNLIMITED if max_iterations is None else max_iterations
+        self.timeout = timeout
+        self.max_memory = max_memory
+        self.check_every = check_every
+        self.loop_blocks = set()  # id() of every loop body seen so far, whose executions are iterations
+        self.interpreter = None
+        self.original = None
+        self.hooks = None  # the interpreter's own attributes this budget replaced, restored on detach
+        self.reset()
+
+    def reset(self):
+        # Clears the counters and starts the clock again
+        self.statements = 0
+        self.iterations = 0
+        self.loop_blocks.clear()
+        self.countdown = self.check_every
+        self.deadline = None if self.timeout is None else monotonic() + self.timeout
+
+    def attach(self, interpreter):
+        self.interpreter = interpreter
+        self.original = dict(interpreter.dispatch)
+        own = vars(interpreter)
+        self.hooks = {name: own.get(name) for name in ("execute_block", "execute_counted_for", "run_block")}
+        dispatch = interpreter.dispatch
+        dispatch[WhileNode] = self.wrap_loop(dispatch[WhileNode])
+        dispatch[ForNode] = self.wrap_loop(dispatch[ForNode])
+        # The worker pool cannot be charged, so PARFOR runs in this process like FOR
+        dispatch[ParForNode] = self.wrap_loop(interpreter.execute_for)
+        enter = self.enter
+        execute_block = interpreter.execute_block
+
+        def limited_block(block):
+            enter(block)
+            execute_block(block)
+
+        interpreter.execute_block = limited_block
+        interpreter.execute_counted_for = self.execute_counted_for
+        async_dispatch = getattr(interpreter, "async_dispatch", None)
+        if async_dispatch is not None:
+            self.attach_async(interpreter, async_dispatch)
+        interpreter.budget = self
+        self.reset()
+        return self
+
+    def attach_async(self, interpreter, async_dispatch):
+        self.original_async = dict(async_dispatch)
+        for node_type in self.LOOPS:
+            async_dispatch[node_type] = self.wrap_async_loop(async_dispatch[node_type])
+        enter = self.enter
+        run_block = interpreter.run_block
+
+        async def limited_run_block(block):
+            enter(block)
+            await run_block(block)
+
+        interpreter.run_block = limited_run_block
+
+    def detach(self):
+        interpreter = self.interpreter
+        interpreter.dispatch.update(self.original)
+        if getattr(interpreter, "async_dispatch", None) is not None:
+            interpreter.async_dispatch.update(self.original_async)
+        restore(interpreter, self.hooks)
+        interpreter.budget = None
+        self.interpreter = None
+
+    def wrap_loop(self, execute):
+        def limited(node):
+            self.enter_loop(node)
+            execute(node)
+            self.leave_loop(node)
+
+        return limited
+
+    def wrap_async_loop(self, execute):
+        async def limited(node):
+            self.enter_loop(node)
+            await execute(node)
+            self.leave_loop(node)
+
+        return limited
+
+    def enter_loop(self, node):
+        self.loop_blocks.add(id(node.block))
+        if node.reduction is not None:
+            node.reduction.count = 0
+            node.reduction.limits = self.reduction_limits(len(node.block))
+
+    def reduction_limits(self, size):
+        # A closed form runs only if all its iterations fit the budget that is left. With a clock
+        # or memory cap, one whose time grows with the count may not replace more iterations than
+        # run between two checks, since nothing can stop it while it computes.
+        allowed = min((self.max_statements - self.statements) / size, self.max_iterations - self.iterations)
+        slow = allowed if self.deadline is None and self.max_memory is None else min(allowed, self.check_every)
+        return allowed, slow
+
+    def leave_loop(self, node):
+        # A closed-form reduction replaced its iterations without entering the body
+        if node.reduction is not None and node.reduction.count:
+            self.iterations += node.reduction.count
+            self.statements += node.reduction.count * len(node.block)
+            self.check()
+
+    def execute_counted_for(self, node, values):
+        # The interpreter's pre-bound FOR loop with every iteration charged
+        slot, step_val, block = node.slot, node.step, node.block
+        stop = node.end + 1 if step_val > 0 else node.end - 1
+        steps = self.interpreter.compile_block(block)
+        enter = self.enter
+        value = None
+        for value in range(node.start, stop, step_val):
+            values[slot] = value
+            enter(block)
+            for run, args in steps:
+                run(*args)
+        values[slot] = node.start if value is None else value + step_val
+
+    def enter(self, block):
+        self.statements += len(block)
+        if id(block) in self.loop_blocks:
+            self.iterations += 1
+        self.countdown -= 1
+        if self.countdown <= 0 or self.statements > self.max_statements or self.iterations > self.max_iterations:
+            self.check()
+
+    def check(self):
+        self.countdown = self.check_every
+        if self.statements > self.max_statements:
+            raise BudgetExceeded("statement", self.max_statements)
+        if self.iterations > self.max_iterations:
+            raise BudgetExceeded("iteration", self.max_iterations)
+        if self.deadline is not None and monotonic() > self.deadline:
+            raise BudgetExceeded("time", f"{self.timeout}s")
+        if self.max_memory is not None and self.interpreter is not None:
+            used = self.memory(self.interpreter.command.frame.values)
+            if used > self.max_memory:
+                raise BudgetExceeded("memory", f"{self.max_memory} bytes")
+
+    def memory(self, values):
+        return sum(sys.getsizeof(value) for value in values)
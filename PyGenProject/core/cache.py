@@ -0,0 +1,62 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+# Bumped whenever the AST or the bytecode changes shape, so stale cache files are never loaded
+INTERPRETER_VERSION = "pygen-6"
+
+
+class ProgramCache:
+    # Stores the compiled form of a program in a __pygcache__ directory next to its source file,
+    # keyed by the hash of the source text, the interpreter version and the engine
+    DIRECTORY = "__pygcache__"
+
+    def __init__(self, directory=None, version=INTERPRETER_VERSION):
+        self.directory = directory
+        self.version = f"{version}-{sys.implementation.cache_tag}"
+
+    def path(self, filename, engine):
+        directory = self.directory or os.path.join(os.path.dirname(os.path.abspath(filename)), self.DIRECTORY)
+        return os.path.join(directory, f"{os.path.basename(filename)}.{engine}.pickle")
+
+    def key(self, source, engine):
+        return (self.version, engine, hashlib.sha256(source.encode("utf-8")).hexdigest())
+
+    def get(self, filename, source, engine, build):
+        # Returns the cached program, or builds it with build(source) and stores it
+        path = self.path(filename, engine)
+        key = self.key(source, engine)
+        program = self.load(path, key)
+        if program is None:
+            program = build(source)
+            self.store(path, key, program)
+        return program
+
+    def load(self, path, key):
+        # The key is a small record of its own in front of the program, so a stale or foreign
+        # file is rejected without deserializing its AST
+        try:
+            with open(path, "rb") as file:
+                if pickle.load(file) != key:
+                    return None
+                return pickle.load(file)
+        except Exception:
+            # Missing, unreadable, truncated or written by another version: compile again
+            return None
+
+    def store(self, path, key, program):
+        # Written to a temporary file and renamed, so a concurrent reader never sees a partial file
+        temp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(handle, "wb") as file:
+                pickle.dump(key, file, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(program, file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except (OSError, pickle.PicklingError, RecursionError):
+            # A read-only location only costs the cache, never the run
+            if temp_path is not None and os.path.exists(temp_path):
+                os.unlink(temp_path)
@@ -1,12 +1,32 @@
 from PyGenProject.utils.error_codes import GetError
+from PyGenProject.utils.output import StdoutSink
+from PyGenProject.utils.inputs import ConsoleInput, InputExhausted
 from tokenizer import Tokenizer
+from conditions import ConditionCompiler
+from frame import Frame, FrameView, UNSET
+from arrays import Array
+import arrays
 
 
 class Commands:
-    def __init__(self):
-        self.variables = {}
-        self.error_handler = GetError()
+    OPERATIONS = ("report", "set_value", "input_value", "arithmetic", "clc", "print_values", "logical", "logical_not",
+                  "update", "update_const", "clc_number", "not_bool",
+                  "array_new", "array_get", "array_put", "array_len", "array_reduce")
+    # Position of the assigned slot in the arguments of every operation that writes a variable
+    TARGETS = {"set_value": 0, "input_value": 0, "arithmetic": 1, "clc": 0, "logical": 1, "logical_not": 0,
+               "update": 1, "update_const": 1, "clc_number": 1, "not_bool": 0,
+               "array_new": 0, "array_get": 0, "array_len": 0, "array_reduce": 1}
+    REDUCTIONS = ("SUM", "MIN", "MAX")
+
+    def __init__(self, output=None, error_handler=None, input_source=None):
+        self.frame = Frame()
+        self.variables = FrameView(self.frame)
+        self.output = output or StdoutSink("line")
+        self.input_source = input_source or ConsoleInput()
+        self.error_handler = error_handler or GetError(self.output)
         self.tokenizer = Tokenizer()
+        self.conditions = ConditionCompiler(self.frame, self.detect_type, self.tokenizer)
+        self.handlers = {name: getattr(self, name) for name in self.OPERATIONS}
 
     def detect_type(self, value):
         try:
@@ -25,208 +45,302 @@ class Commands:
             return False
         return value
 
+    def resolve(self, cmd, parts):
+        # Binds a statement to an operation and its slot-indexed arguments, once per statement
+        slot = self.frame.slot
+        if cmd == "SET":
+            if len(parts) < 3:
+                return "report", ("E006", {"cmd": "SET"})
+            return "set_value", (slot(parts[1]), slot(parts[2]), self.detect_type(parts[2]))
+        elif cmd == "INPUT":
+            if len(parts) < 2:
+                return "report", ("E006", {"cmd": "INPUT"})
+            return "input_value", (slot(parts[1]),)
+        elif cmd in ("ADD", "SUB", "MUL", "DIV", "MOD"):
+            if len(parts) < 3:
+                return "report", ("E006", {"cmd": cmd})
+            return "arithmetic", (cmd, slot(parts[1]), slot(parts[2]), self.detect_type(parts[2]))
+        elif cmd == "CLC":
+            if len(parts) != 5:
+                return "report", ("E007", {})
+            target, left, op, right = parts[1:]
+            return "clc", (slot(target), slot(left), op, slot(right))
+        elif cmd == "PRINT":
+            items = []
+            for token in parts[1:]:
+                if token.startswith('"') and token.endswith('"'):
+                    items.append((None, token[1:-1]))
+                else:
+                    items.append((slot(token), token))
+            return "print_values", (tuple(items),)
+        elif cmd == "NOT":
+            if len(parts) != 2:
+                return "report", ("E006", {"cmd": cmd})
+            return "logical_not", (slot(parts[1]),)
+        elif cmd in ("AND", "OR", "XOR"):
+            if len(parts) < 3:
+                return "report", ("E006", {"cmd": cmd})
+            value = parts[2]
+            # A literal operand that is not TRUE/FALSE stays a string and is reported as E002
+            literal = value.lower() == "true" if value.lower() in ["true", "false"] else value
+            return "logical", (cmd, slot(parts[1]), slot(value), literal)
+        elif cmd == "ARRAY":
+            if len(parts) < 4:
+                return "report", ("E006", {"cmd": cmd})
+            size, init = parts[2], parts[3]
+            return "array_new", (slot(parts[1]), slot(size), self.detect_type(size), slot(init), self.detect_type(init))
+        elif cmd == "GET":
+            if len(parts) < 4:
+                return "report", ("E006", {"cmd": cmd})
+            return "array_get", (slot(parts[1]), slot(parts[2]), slot(parts[3]), self.detect_type(parts[3]))
+        elif cmd == "PUT":
+            if len(parts) < 4:
+                return "report", ("E006", {"cmd": cmd})
+            index, value = parts[2], parts[3]
+            return "array_put", (slot(parts[1]), slot(index), self.detect_type(index), slot(value), self.detect_type(value))
+        elif cmd == "LEN":
+            if len(parts) < 3:
+                return "report", ("E006", {"cmd": cmd})
+            return "array_len", (slot(parts[1]), slot(parts[2]))
+        elif cmd in self.REDUCTIONS:
+            if len(parts) < 3:
+                return "report", ("E006", {"cmd": cmd})
+            return "array_reduce", (cmd, slot(parts[1]), slot(parts[2]))
+        return "report", ("E001", {"cmd": cmd})
+
+    def execute(self, cmd, parts):
+        op, args = self.resolve(cmd, parts)
+        self.handlers[op](*args)
+
     def execute_set(self, parts):
-        if len(parts) < 3:
-            self.error_handler.get_error("E006", cmd="SET")
-            return
-        value = parts[2]
-        if value in self.variables:
-            value = self.variables[value]
-        else:
-            value = self.detect_type(value)
-        self.variables[parts[1]] = value
+        self.execute("SET", parts)
 
     def execute_input(self, parts):
-        try:
-            inp = input(f"{parts[1]} = ")
-        except KeyboardInterrupt:
-            self.error_handler.get_error("E005", var=parts[1])
-            return
-        inp = self.detect_type(inp)
-        self.variables[parts[1]] = inp
+        self.execute("INPUT", parts)
 
     def execute_arithmetic(self, cmd, parts):
-        if len(parts) < 3:
-            self.error_handler.get_error("E006", cmd=cmd)
+        self.execute(cmd, parts)
+
+    def execute_clc(self, parts):
+        self.execute("CLC", parts)
+
+    def execute_print(self, parts):
+        self.execute("PRINT", parts)
+
+    def execute_logical(self, cmd, parts):
+        self.execute(cmd, parts)
+
+    def report(self, code, kwargs):
+        self.error_handler.get_error(code, **kwargs)
+
+    def set_value(self, target, source, literal):
+        values = self.frame.values
+        value = values[source]
+        values[target] = literal if value is UNSET else value
+
+    def input_value(self, target):
+        name = self.frame.names[target]
+        if self.input_source.interactive:
+            self.output.flush()
+        try:
+            value = self.input_source.read(name, self.detect_type)
+        except (KeyboardInterrupt, InputExhausted):
+            self.error_handler.get_error("E005", var=name)
             return
-        var, value = parts[1], parts[2]
-        if var not in self.variables or not isinstance(self.variables[var], (int, float)):
-            self.error_handler.get_error("E003", var=var)
+        self.frame.values[target] = value
+
+    def arithmetic(self, cmd, target, source, literal):
+        values = self.frame.values
+        current = values[target]
+        if current is UNSET or not isinstance(current, (int, float)):
+            if type(current) is Array:
+                self.arithmetic_array(cmd, target, current, source, literal)
+                return
+            self.error_handler.get_error("E003", var=self.frame.names[target])
             return
-        if value in self.variables:
-            value = self.variables[value]
-        else:
-            value = self.detect_type(value)
+        value = values[source]
+        if value is UNSET:
+            value = literal
         if not isinstance(value, (int, float)):
+            if type(value) is Array:
+                self.arithmetic_array(cmd, target, current, source, literal)
+                return
             self.error_handler.get_error("E002", cmd=cmd, val=value)
             return
         if cmd == "ADD":
-            self.variables[var] += value
+            values[target] = current + value
         elif cmd == "SUB":
-            self.variables[var] -= value
+            values[target] = current - value
         elif cmd == "MUL":
-            self.variables[var] *= value
+            values[target] = current * value
         elif cmd == "DIV":
             if value == 0:
                 self.error_handler.get_error("E004")
                 return
-            self.variables[var] /= value
+            values[target] = current / value
         elif cmd == "MOD":
-            self.variables[var] %= value
+            values[target] = current % value
 
-    def execute_clc(self, parts):
-        if len(parts) != 5:
-            self.error_handler.get_error("E007")
-            return
-        target, left, op, right = parts[1:]
-        if left not in self.variables:
-            self.error_handler.get_error("E008", var=left)
+    def clc(self, target, left, op, right):
+        values = self.frame.values
+        a, b = values[left], values[right]
+        if a is UNSET:
+            self.error_handler.get_error("E008", var=self.frame.names[left])
             return
-        if right not in self.variables:
-            self.error_handler.get_error("E008", var=right)
+        if b is UNSET:
+            self.error_handler.get_error("E008", var=self.frame.names[right])
             return
-        a, b = self.variables[left], self.variables[right]
         if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+            if isinstance(a, (int, float, Array)) and isinstance(b, (int, float, Array)):
+                self.combine(op, target, a, b)
+                return
             self.error_handler.get_error("E009")
             return
         if op == "ADD":
-            self.variables[target] = a + b
+            values[target] = a + b
         elif op == "SUB":
-            self.variables[target] = a - b
+            values[target] = a - b
         elif op == "MUL":
-            self.variables[target] = a * b
+            values[target] = a * b
         elif op == "DIV":
             if b == 0:
                 self.error_handler.get_error("E004")
                 return
-            self.variables[target] = a / b
+            values[target] = a / b
         elif op == "MOD":
-            self.variables[target] = a % b
+            values[target] = a % b
         else:
             self.error_handler.get_error("E010", op=op)
 
-    def execute_print(self, parts):
-        output = []
-        for token in parts[1:]:
-            if token.startswith('"') and token.endswith('"'):
-                output.append(token[1:-1])
-            elif token in self.variables:
-                output.append(str(self.variables[token]))
-            else:
-                output.append(token)
-        print(" ".join(output))
+    # Arrays. The element-wise paths are only reached once the scalar checks above have failed,
+    # so programs without arrays run exactly as before.
+    def arithmetic_array(self, cmd, target, current, source, literal):
+        value = self.frame.values[source]
+        if value is UNSET:
+            value = literal
+        if not isinstance(value, (int, float, Array)):
+            self.error_handler.get_error("E002", cmd=cmd, val=value)
+            return
+        self.combine(cmd, target, current, value)
 
-    def execute_logical(self, cmd, parts):
-        if cmd == "NOT":
-            if len(parts) != 2:
-                self.error_handler.get_error("E006", cmd=cmd)
-                return
-            var = parts[1]
-            if var not in self.variables or not isinstance(self.variables[var], bool):
-                self.error_handler.get_error("E003", var=var)
-                return
-            self.variables[var] = not self.variables[var]
-        else:
-            if len(parts) < 3:
-                self.error_handler.get_error("E006", cmd=cmd)
-                return
-            var = parts[1]
-            value = parts[2]
-            if var not in self.variables or not isinstance(self.variables[var], bool):
-                self.error_handler.get_error("E003", var=var)
-                return
-            if value in self.variables:
-                value = self.variables[value]
-            elif value.lower() in ["true", "false"]:
-                value = value.lower() == "true"
-            else:
-                self.error_handler.get_error("E002", cmd=cmd, val=value)
-                return
-            if cmd == "AND":
-                self.variables[var] = self.variables[var] and value
-            elif cmd == "OR":
-                self.variables[var] = self.variables[var] or value
-            elif cmd == "XOR":
-                self.variables[var] = (self.variables[var] and not value) or (not self.variables[var] and value)
-            else:
-                self.error_handler.get_error("E001", cmd=cmd, val=value)
+    def combine(self, cmd, target, left, right):
+        if cmd not in arrays.FUNCTIONS:
+            self.error_handler.get_error("E010", op=cmd)
+            return
+        result = arrays.combine(cmd, left, right, self.error_handler.get_error)
+        if result is not None:
+            self.frame.values[target] = result
 
-    def evaluate_expression(self, expr_parts):
-        if not expr_parts:
-            self.error_handler.get_error("E011")
-            return False
+    def array_operand(self, slot):
+        value = self.frame.values[slot]
+        if type(value) is not Array:
+            self.error_handler.get_error("E028", var=self.frame.names[slot])
+            return None
+        return value
 
-        not_flag = False
-        if expr_parts[0].upper() == "NOT":
-            not_flag = True
-            expr_parts = expr_parts[1:]
+    def array_new(self, target, size_slot, size, init_slot, init):
+        values = self.frame.values
+        if values[size_slot] is not UNSET:
+            size = values[size_slot]
+        if values[init_slot] is not UNSET:
+            init = values[init_slot]
+        result = arrays.new(size, init, self.error_handler.get_error)
+        if result is not None:
+            values[target] = result
 
-        if len(expr_parts) != 3:
-            self.error_handler.get_error("E011")
-            return False
+    def array_get(self, target, source, index_slot, index):
+        values = self.frame.values
+        array = self.array_operand(source)
+        if array is None:
+            return
+        if values[index_slot] is not UNSET:
+            index = values[index_slot]
+        value = arrays.get(array, index, self.frame.names[source], self.error_handler.get_error)
+        if value is not None:
+            values[target] = value
 
-        left = expr_parts[0]
-        op = expr_parts[1]
-        right = expr_parts[2]
+    def array_put(self, target, index_slot, index, value_slot, value):
+        values = self.frame.values
+        array = self.array_operand(target)
+        if array is None:
+            return
+        if values[index_slot] is not UNSET:
+            index = values[index_slot]
+        if values[value_slot] is not UNSET:
+            value = values[value_slot]
+        arrays.put(array, index, value, self.frame.names[target], self.error_handler.get_error)
 
-        a = self.variables.get(left) if left in self.variables else self.detect_type(left)
-        b = self.variables.get(right) if right in self.variables else self.detect_type(right)
+    def array_len(self, target, source):
+        array = self.array_operand(source)
+        if array is not None:
+            self.frame.values[target] = len(array)
 
-        if not (isinstance(a, (int, float, bool, str)) and isinstance(b, type(a))):
-            self.error_handler.get_error("E009")
-            return False
+    def array_reduce(self, cmd, target, source):
+        array = self.array_operand(source)
+        if array is None:
+            return
+        value = arrays.reduce(cmd, array, self.error_handler.get_error)
+        if value is not None:
+            self.frame.values[target] = value
 
-        if op == "==":
-            result = a == b
-        elif op == "!=":
-            result = a != b
-        elif op == "<":
-            result = a < b
-        elif op == ">":
-            result = a > b
-        elif op == "<=":
-            result = a <= b
-        elif op == ">=":
-            result = a >= b
-        else:
-            self.error_handler.get_error("E012", op=op)
-            return False
+    def print_values(self, items):
+        values = self.frame.values
+        output = []
+        for slot, text in items:
+            if slot is None:
+                output.append(text)
+            else:
+                value = values[slot]
+                output.append(text if value is UNSET else str(value))
+        self.output.write_line(" ".join(output))
 
-        return not result if not_flag else result
+    def logical_not(self, target):
+        values = self.frame.values
+        if not isinstance(values[target], bool):
+            self.error_handler.get_error("E003", var=self.frame.names[target])
+            return
+        values[target] = not values[target]
 
-    def evaluate_condition(self, condition_str):
-        parts = self.tokenizer.tokenize(condition_str)
+    def logical(self, cmd, target, source, literal):
+        values = self.frame.values
+        current = values[target]
+        if not isinstance(current, bool):
+            self.error_handler.get_error("E003", var=self.frame.names[target])
+            return
+        value = values[source]
+        if value is UNSET:
+            if not isinstance(literal, bool):
+                self.error_handler.get_error("E002", cmd=cmd, val=literal)
+                return
+            value = literal
+        if cmd == "AND":
+            values[target] = current and value
+        elif cmd == "OR":
+            values[target] = current or value
+        elif cmd == "XOR":
+            values[target] = (current and not value) or (not current and value)
 
-        if not parts:
-            self.error_handler.get_error("E013")
-            return False
+    # Specialized operations, bound by the TypeChecker where it has proven the operand types, so
+    # they skip the UNSET and isinstance checks of the operations above. `function` comes from
+    # the operator module: ADD/SUB/MUL/MOD on numbers and AND/OR/XOR on booleans.
+    def update(self, function, target, source):
+        values = self.frame.values
+        values[target] = function(values[target], values[source])
 
-        expressions = []
-        operators = []
-        current_expr = []
-        for token in parts:
-            upper_token = token.upper()
-            if upper_token in ["AND", "OR"]:
-                if current_expr:
-                    expressions.append(current_expr)
-                operators.append(upper_token)
-                current_expr = []
-            else:
-                current_expr.append(token)
-        if current_expr:
-            expressions.append(current_expr)
+    def update_const(self, function, target, value):
+        values = self.frame.values
+        values[target] = function(values[target], value)
 
-        if not expressions:
-            self.error_handler.get_error("E013")
-            return False
+    def clc_number(self, function, target, left, right):
+        values = self.frame.values
+        values[target] = function(values[left], values[right])
 
-        result = self.evaluate_expression(expressions[0])
+    def not_bool(self, target):
+        values = self.frame.values
+        values[target] = not values[target]
 
-        for idx, op in enumerate(operators):
-            next_result = self.evaluate_expression(expressions[idx + 1])
-            if op == "AND":
-                result = result and next_result
-            elif op == "OR":
-                result = result or next_result
+    def evaluate_expression(self, expr_parts):
+        return self.conditions.compile_expression(expr_parts)(self.frame.values, self.error_handler.get_error)
 
-        return result
+    def evaluate_condition(self, condition_str):
+        return self.conditions.compile(condition_str)(self.frame.values, self.error_handler.get_error)
@@ -0,0 +1,222 @@
+from array import array
+
+from tokenizer import Tokenizer
+from commands import Commands
+from conditions import ConditionCompiler
+from nodes import Statement, IfNode, WhileNode, ForNode, ErrorNode
+from opcodes import (
+    LOAD_VALUE, LOAD_CONST, STORE, INPUT, ARITH, CLC, PRINT, LOGIC, NOT, COMPARE,
+    JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP, JUMP, JUMP_IF_FALSE, FOR_INIT, FOR_ITER, FOR_STEP, ERROR,
+    ARRAY_NEW, GET_ITEM, PUT_ITEM, ARRAY_LEN, ARRAY_REDUCE,
+    ARITH_KINDS, LOGIC_KINDS, REDUCE_KINDS,
+)
+
+
+class CodeObject:
+    def __init__(self, code, consts, names, lines):
+        self.code = code
+        self.consts = consts
+        self.names = names
+        self.lines = lines  # source line of every code unit, parallel to `code`
+
+
+class Compiler:
+    def __init__(self, tokenizer=None, detect_type=None):
+        self.tokenizer = tokenizer or Tokenizer()
+        self.detect_type = detect_type or Commands().detect_type
+        self.code = array("i")
+        self.lines = array("i")
+        self.consts = []
+        self.const_index = {}
+        self.names = []
+        self.name_index = {}
+        self.line = 0
+
+    def compile(self, program):
+        self.code = array("i")
+        self.lines = array("i")
+        self.consts = []
+        self.const_index = {}
+        self.names = []
+        self.name_index = {}
+        self.compile_block(program)
+        return CodeObject(self.code, self.consts, self.names, self.lines)
+
+    def const(self, value):
+        key = (type(value), value)
+        if key not in self.const_index:
+            self.const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return self.const_index[key]
+
+    def name(self, value):
+        if value not in self.name_index:
+            self.name_index[value] = len(self.names)
+            self.names.append(value)
+        return self.name_index[value]
+
+    def emit(self, op, *args):
+        self.code.append(op)
+        self.code.extend(args)
+        self.lines.extend([self.line] * (len(args) + 1))
+        return len(self.code) - 1  # position of the last operand, used to patch jumps
+
+    def patch(self, position, target=None):
+        self.code[position] = len(self.code) if target is None else target
+
+    def error(self, code, **kwargs):
+        self.emit(ERROR, self.const(code), self.const(tuple(kwargs.items())))
+
+    def compile_block(self, block):
+        for node in block:
+            self.line = node.line
+            if isinstance(node, Statement):
+                self.compile_statement(node)
+            elif isinstance(node, IfNode):
+                self.compile_if(node)
+            elif isinstance(node, WhileNode):
+                self.compile_while(node)
+            elif isinstance(node, ForNode):
+                self.compile_for(node)
+            elif isinstance(node, ErrorNode):
+                self.error(node.code, **node.kwargs)
+
+    def load_value(self, token):
+        self.emit(LOAD_VALUE, self.name(token), self.const(self.detect_type(token)))
+
+    def compile_statement(self, node):
+        cmd, parts = node.cmd, node.parts
+        if cmd == "SET":
+            if len(parts) < 3:
+                self.error("E006", cmd="SET")
+                return
+            self.load_value(parts[2])
+            self.emit(STORE, self.name(parts[1]))
+        elif cmd == "INPUT":
+            if len(parts) < 2:
+                self.error("E006", cmd="INPUT")
+                return
+            self.emit(INPUT, self.name(parts[1]))
+        elif cmd in ARITH_KINDS:
+            if len(parts) < 3:
+                self.error("E006", cmd=cmd)
+                return
+            self.load_value(parts[2])
+            self.emit(ARITH, ARITH_KINDS.index(cmd), self.name(parts[1]))
+        elif cmd == "CLC":
+            if len(parts) != 5:
+                self.error("E007")
+                return
+            target, left, op, right = parts[1:]
+            kind = ARITH_KINDS.index(op) if op in ARITH_KINDS else -1
+            self.emit(CLC, self.name(target), self.name(left), self.name(right), kind, self.const(op))
+        elif cmd == "PRINT":
+            for token in parts[1:]:
+                if token.startswith('"') and token.endswith('"'):
+                    self.emit(LOAD_CONST, self.const(token[1:-1]))
+                else:
+                    self.emit(LOAD_VALUE, self.name(token), self.const(token))
+            self.emit(PRINT, len(parts) - 1)
+        elif cmd == "NOT":
+            if len(parts) != 2:
+                self.error("E006", cmd=cmd)
+                return
+            self.emit(NOT, self.name(parts[1]))
+        elif cmd in LOGIC_KINDS:
+            if len(parts) < 3:
+                self.error("E006", cmd=cmd)
+                return
+            value = parts[2]
+            # A literal operand that is not TRUE/FALSE stays a string; the VM reports it as E002
+            literal = value.lower() == "true" if value.lower() in ["true", "false"] else value
+            self.emit(LOGIC, LOGIC_KINDS.index(cmd), self.name(parts[1]), self.name(value), self.const(literal))
+        elif cmd in ("ARRAY", "GET", "PUT"):
+            if len(parts) < 4:
+                self.error("E006", cmd=cmd)
+                return
+            if cmd == "ARRAY":
+                self.load_value(parts[2])
+                self.load_value(parts[3])
+                self.emit(ARRAY_NEW, self.name(parts[1]))
+            elif cmd == "GET":
+                self.load_value(parts[3])
+                self.emit(GET_ITEM, self.name(parts[1]), self.name(parts[2]))
+            else:
+                self.load_value(parts[2])
+                self.load_value(parts[3])
+                self.emit(PUT_ITEM, self.name(parts[1]))
+        elif cmd == "LEN" or cmd in REDUCE_KINDS:
+            if len(parts) < 3:
+                self.error("E006", cmd=cmd)
+                return
+            if cmd == "LEN":
+                self.emit(ARRAY_LEN, self.name(parts[1]), self.name(parts[2]))
+            else:
+                self.emit(ARRAY_REDUCE, REDUCE_KINDS.index(cmd), self.name(parts[1]), self.name(parts[2]))
+        else:
+            self.error("E001", cmd=cmd)
+
+    def compile_condition(self, condition_str):
+        expressions, operators = ConditionCompiler.split(self.tokenizer.tokenize(condition_str))
+        if not expressions or len(expressions) != len(operators) + 1:
+            self.error("E013")
+            self.emit(LOAD_CONST, self.const(False))
+            return
+        self.compile_expression(expressions[0])
+        # AND/OR fold left to right; a decided result skips the remaining expression
+        for idx, op in enumerate(operators):
+            decided = self.emit(JUMP_IF_FALSE_OR_POP if op == "AND" else JUMP_IF_TRUE_OR_POP, 0)
+            self.compile_expression(expressions[idx + 1])
+            self.patch(decided)
+
+    def compile_expression(self, expr_parts):
+        negate = 0
+        if expr_parts[0].upper() == "NOT":
+            negate = 1
+            expr_parts = expr_parts[1:]
+        if len(expr_parts) != 3:
+            self.error("E011")
+            self.emit(LOAD_CONST, self.const(False))
+            return
+        left, op, right = expr_parts
+        self.emit(COMPARE, self.name(left), self.const(self.detect_type(left)),
+                  self.name(right), self.const(self.detect_type(right)), self.const(op), negate)
+
+    def compile_if(self, node):
+        exits = []
+        for condition, block in node.branches:
+            if condition is None:
+                self.error("E014")  # ELIF without THEN never runs its block
+                continue
+            self.compile_condition(condition)
+            skip = self.emit(JUMP_IF_FALSE, 0)
+            self.compile_block(block)
+            self.line = node.line
+            exits.append(self.emit(JUMP, 0))
+            self.patch(skip)
+        self.compile_block(node.else_block)
+        for position in exits:
+            self.patch(position)
+
+    def compile_while(self, node):
+        top = len(self.code)
+        self.compile_condition(node.condition)
+        done = self.emit(JUMP_IF_FALSE, 0)
+        self.compile_block(node.block)
+        self.line = node.line
+        self.emit(JUMP, top)
+        self.patch(done)
+
+    def compile_for(self, node):
+        if not all(isinstance(val, (int, float)) for val in [node.start, node.end, node.step]):
+            self.error("E019")
+            return
+        var = self.name(node.var)
+        self.emit(FOR_INIT, var, self.const(node.start))
+        top = len(self.code)
+        done = self.emit(FOR_ITER, var, self.const(node.end), self.const(node.step), 0)
+        self.compile_block(node.block)
+        self.line = node.line
+        self.emit(FOR_STEP, var, self.const(node.step))
+        self.emit(JUMP, top)
+        self.patch(done)
@@ -0,0 +1,142 @@
+import operator
+from collections import OrderedDict
+
+from tokenizer import Tokenizer
+from frame import UNSET
+
+
+class ConditionCompiler:
+    COMPARISONS = {
+        "==": operator.eq, "!=": operator.ne,
+        "<": operator.lt, ">": operator.gt,
+        "<=": operator.le, ">=": operator.ge,
+    }
+
+    def __init__(self, frame, detect_type, tokenizer=None, maxsize=256):
+        self.frame = frame
+        self.detect_type = detect_type
+        self.tokenizer = tokenizer or Tokenizer()
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+
+    def compile(self, condition_str, typing=None):
+        # Compiled conditions are called as evaluate(values, error) and cached by their text.
+        # `typing` is the type checker's hook for one call site (see compile_expression); those
+        # conditions depend on where they appear, so they are not cached.
+        if typing is not None:
+            return self.compile_condition(condition_str, typing)
+        evaluate = self.cache.get(condition_str)
+        if evaluate is not None:
+            self.cache.move_to_end(condition_str)
+            return evaluate
+        evaluate = self.compile_condition(condition_str)
+        self.cache[condition_str] = evaluate
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return evaluate
+
+    @staticmethod
+    def split(parts):
+        # Condition tokens -> the comparisons between AND/OR and the operators joining them; the
+        # VM compiler splits conditions with this too
+        expressions = []
+        operators = []
+        current_expr = []
+        for token in parts:
+            upper_token = token.upper()
+            if upper_token in ["AND", "OR"]:
+                if current_expr:
+                    expressions.append(current_expr)
+                operators.append(upper_token)
+                current_expr = []
+            else:
+                current_expr.append(token)
+        if current_expr:
+            expressions.append(current_expr)
+        return expressions, operators
+
+    def compile_condition(self, condition_str, typing=None):
+        expressions, operators = self.split(self.tokenizer.tokenize(condition_str))
+        if not expressions or len(expressions) != len(operators) + 1:
+            return self.compile_error("E013")
+
+        evaluate = self.compile_expression(expressions[0], typing)
+        # AND/OR are applied left to right without precedence, stopping as soon as the result is decided
+        for op, expr_parts in zip(operators, expressions[1:]):
+            evaluate = self.combine(op, evaluate, self.compile_expression(expr_parts, typing))
+        return evaluate
+
+    def combine(self, op, left, right):
+        if op == "AND":
+            def evaluate(values, error):
+                return left(values, error) and right(values, error)
+        else:
+            def evaluate(values, error):
+                return left(values, error) or right(values, error)
+        return evaluate
+
+    def compile_error(self, code):
+        def evaluate(values, error):
+            error(code)
+            return False
+        return evaluate
+
+    def compile_expression(self, expr_parts, typing=None):
+        if not expr_parts:
+            return self.compile_error("E011")
+
+        not_flag = False
+        if expr_parts[0].upper() == "NOT":
+            not_flag = True
+            expr_parts = expr_parts[1:]
+
+        if len(expr_parts) != 3:
+            return self.compile_error("E011")
+
+        left, op, right = expr_parts
+        left_slot = self.frame.slot(left)
+        right_slot = self.frame.slot(right)
+        left_value = self.detect_type(left)
+        right_value = self.detect_type(right)
+        compare = self.COMPARISONS.get(op)
+        if typing is not None and compare is not None:
+            # typing(...) returns the operands as ("slot", slot) or ("const", value) once both are
+            # proven to be set or unset and to compare without E009, and None otherwise
+            operands = typing(left_slot, left_value, right_slot, right_value)
+            if operands is not None:
+                return self.compile_typed(compare, not_flag, *operands)
+
+        def evaluate(values, error):
+            a = values[left_slot]
+            if a is UNSET:
+                a = left_value
+            b = values[right_slot]
+            if b is UNSET:
+                b = right_value
+            if not (isinstance(a, (int, float, bool, str)) and isinstance(b, type(a))):
+                error("E009")
+                return False
+            if compare is None:
+                error("E012", op=op)
+                return False
+            result = compare(a, b)
+            return not result if not_flag else result
+        return evaluate
+
+    def compile_typed(self, compare, not_flag, left, right):
+        # A comparison without the UNSET and type checks
+        (left_kind, a), (right_kind, b) = left, right
+        if left_kind == "const" and right_kind == "const":
+            result = compare(a, b) != not_flag
+            return lambda values, error: result
+        if left_kind == "const":
+            if not_flag:
+                return lambda values, error: not compare(a, values[b])
+            return lambda values, error: compare(a, values[b])
+        if right_kind == "const":
+            if not_flag:
+                return lambda values, error: not compare(values[a], b)
+            return lambda values, error: compare(values[a], b)
+        if not_flag:
+            return lambda values, error: not compare(values[a], values[b])
+        return lambda values, error: compare(values[a], values[b])
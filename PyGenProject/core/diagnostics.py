@@ -0,0 +1,206 @@
+import json
+
+from PyGenProject.utils.error_codes import GetError, ProgramStopped, ProgramError
+
+POLICIES = ("continue", "stop", "raise")
+
+
+def parse_policy(rules):
+    # ["math=stop", "E003=continue", "raise"] -> ({"math": "stop", "E003": "continue"}, "raise"):
+    # a rule without a class sets the default
+    policy, default = {}, "continue"
+    for rule in rules:
+        name, _, action = rule.rpartition("=")
+        if action not in POLICIES:
+            raise ValueError(f"unknown action '{action}' (choose from {', '.join(POLICIES)})")
+        if not name:
+            default = action
+        elif name[:1] in "Ee" and name[1:].isdigit():
+            policy[name.upper()] = action
+        else:
+            policy[name.lower()] = action
+    return policy, default
+
+
+class Diagnostic:
+    # One error of a program: its code and message, where it happened (line, column and the
+    # statement's source text, when known) and how often it happened there
+    __slots__ = ("code", "message", "line", "column", "text", "count")
+
+    def __init__(self, code, message, line=None, column=None, text=None):
+        self.code = code
+        self.message = message
+        self.line = line
+        self.column = column
+        self.text = text
+        self.count = 1
+
+    def __str__(self):
+        return self.message if self.line is None else f"Line {self.line}: {self.message}"
+
+    def __repr__(self):
+        return f"Diagnostic({self.code!r}, line={self.line!r}, count={self.count!r})"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ErrorCollector(GetError):
+    # An error handler that keeps structured Diagnostics instead of only printing messages. Errors
+    # are grouped by (code, line) with a count, only the first of every group is printed, and no
+    # more than `max_reports` are printed in total. `policy` maps an error class ("arithmetic",
+    # "math", "syntax", ...: the first word of the message) or a code to "continue", "stop" or
+    # "raise"; anything else gets `default`. attach() lets any engine supply locations.
+    def __init__(self, output=None, color=True, policy=None, default="continue", max_reports=None):
+        super().__init__(output, color)
+        self.policy = dict(policy or {})
+        for action in [default, *self.policy.values()]:
+            if action not in POLICIES:
+                raise ValueError(f"Unknown error policy '{action}'")
+        self.default = default
+        self.max_reports = max_reports
+        self.diagnostics = {}  # (code, line) -> Diagnostic, in the order they first happened
+        self.reported = 0
+        self.suppressed = 0
+        self.node = None  # the node being executed, kept up to date once attached
+        self.where = None  # returns the current line, once attached to the VM, which has no nodes
+        self.lines = ()
+        self.first_line = 1
+        self.interpreter = None
+        self.original = None
+        self.original_async = None
+
+    def set_source(self, source, first_line=1):
+        # The text the running program was parsed from, for the column and statement text; a
+        # streamed program sets it for every piece, so only the current piece is kept
+        self.lines = source.split("\n")
+        self.first_line = first_line
+
+    def attach(self, interpreter):
+        # Like the Profiler, swaps wrappers into the tree interpreter's dispatch tables that keep
+        # self.node on the node being executed, so runtime errors get a line. The VM looks the line
+        # up from its instruction pointer when an error is reported.
+        self.interpreter = interpreter
+        dispatch = getattr(interpreter, "dispatch", None)
+        if dispatch is None:
+            self.where = interpreter.current_line
+        else:
+            self.original = dict(dispatch)
+            for node_type, execute in dispatch.items():
+                dispatch[node_type] = self.wrap(execute)
+            async_dispatch = getattr(interpreter, "async_dispatch", None)
+            if async_dispatch is not None:
+                self.original_async = dict(async_dispatch)
+                for node_type, execute in async_dispatch.items():
+                    async_dispatch[node_type] = self.wrap_async(execute)
+        parse = interpreter.parser.parse
+
+        def parse_source(source, first_line=1):
+            self.set_source(source, first_line)
+            return parse(source, first_line)
+
+        interpreter.parser.parse = parse_source
+        interpreter.diagnostics = self
+        return self
+
+    def detach(self):
+        interpreter = self.interpreter
+        if self.where is not None:
+            self.where = None
+        else:
+            interpreter.dispatch.update(self.original)
+            if getattr(interpreter, "async_dispatch", None) is not None:
+                interpreter.async_dispatch.update(self.original_async)
+        del interpreter.parser.parse
+        interpreter.diagnostics = None
+        self.interpreter = None
+
+    def wrap(self, execute):
+        def located(node):
+            outer = self.node
+            self.node = node
+            execute(node)
+            self.node = outer
+
+        return located
+
+    def wrap_async(self, execute):
+        async def located(node):
+            outer = self.node
+            self.node = node
+            await execute(node)
+            self.node = outer
+
+        return located
+
+    def reset(self):
+        self.diagnostics.clear()
+        self.reported = 0
+        self.suppressed = 0
+        self.node = None
+
+    def error_class(self, code):
+        return self.ERROR_CODES.get(code, "Unknown").split(" ", 1)[0].lower()
+
+    def get_error(self, code, line=None, **kwargs):
+        if line is None:
+            if self.node is not None:
+                line = self.node.line or None
+            elif self.where is not None:
+                line = self.where()
+        diagnostic = self.diagnostics.get((code, line))
+        if diagnostic is None:
+            diagnostic = Diagnostic(code, self.message(code, **kwargs), line)
+        self.add(diagnostic, 1)
+
+    def merge(self, diagnostic):
+        # Takes over a Diagnostic another collector made, such as a PARFOR worker's, with its count
+        known = self.diagnostics.get((diagnostic.code, diagnostic.line))
+        if known is None:
+            known = Diagnostic(diagnostic.code, diagnostic.message, diagnostic.line)
+            known.count = 0
+        self.add(known, diagnostic.count)
+
+    def add(self, diagnostic, count):
+        code = diagnostic.code
+        if (code, diagnostic.line) in self.diagnostics:
+            diagnostic.count += count
+            self.suppressed += count
+        else:
+            diagnostic.count = count
+            self.diagnostics[code, diagnostic.line] = self.locate(diagnostic)
+            if self.max_reports is None or self.reported < self.max_reports:
+                self.reported += 1
+                self.suppressed += count - 1
+                self.write(str(diagnostic))
+            else:
+                self.suppressed += count
+        action = self.policy.get(code) or self.policy.get(self.error_class(code), self.default)
+        if action == "stop":
+            raise ProgramStopped(diagnostic)
+        if action == "raise":
+            raise ProgramError(diagnostic)
+
+    def locate(self, diagnostic):
+        index = -1 if diagnostic.line is None else diagnostic.line - self.first_line
+        if 0 <= index < len(self.lines):
+            text = self.lines[index].split("//", 1)[0].rstrip()
+            diagnostic.column = len(text) - len(text.lstrip()) + 1
+            diagnostic.text = text.strip()
+        return diagnostic
+
+    def summary(self):
+        return [diagnostic.to_dict() for diagnostic in self.diagnostics.values()]
+
+    def report(self):
+        # Closing lines for the output once messages were held back
+        if not self.suppressed:
+            return []
+        total = sum(diagnostic.count for diagnostic in self.diagnostics.values())
+        return [f"{total} errors at {len(self.diagnostics)} locations, {self.suppressed} not printed:"] + [
+            f"  {diagnostic.code} x{diagnostic.count}" + ("" if diagnostic.line is None else f" at line {diagnostic.line}")
+            for diagnostic in self.diagnostics.values()]
+
+    def to_json(self):
+        total = sum(diagnostic.count for diagnostic in self.diagnostics.values())
+        return json.dumps({"errors": total, "printed": self.reported, "diagnostics": self.summary()}, indent=2)
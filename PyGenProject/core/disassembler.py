@@ -0,0 +1,40 @@
+from opcodes import (
+    OPNAMES, ARITY, NAME_OPERANDS, CONST_OPERANDS, JUMP_OPERANDS,
+    ARITH, CLC, LOGIC, ARRAY_REDUCE, ARITH_KINDS, LOGIC_KINDS, REDUCE_KINDS,
+)
+
+
+class Disassembler:
+    def describe(self, code_object, op, args):
+        notes = []
+        for idx, arg in enumerate(args):
+            if idx in NAME_OPERANDS.get(op, ()):
+                notes.append(code_object.names[arg])
+            elif idx in CONST_OPERANDS.get(op, ()):
+                notes.append(repr(code_object.consts[arg]))
+            elif JUMP_OPERANDS.get(op) == idx:
+                notes.append(f"to {arg}")
+            elif op == ARITH or (op == CLC and idx == 3):
+                notes.append(ARITH_KINDS[arg] if arg >= 0 else "unknown")
+            elif op == LOGIC and idx == 0:
+                notes.append(LOGIC_KINDS[arg])
+            elif op == ARRAY_REDUCE and idx == 0:
+                notes.append(REDUCE_KINDS[arg])
+        return ", ".join(notes)
+
+    def disassemble(self, code_object):
+        code = code_object.code
+        output = []
+        last_line = None
+        pc = 0
+        while pc < len(code):
+            op = code[pc]
+            args = list(code[pc + 1:pc + 1 + ARITY[op]])
+            line = code_object.lines[pc]
+            line_col = str(line) if line != last_line else ""
+            last_line = line
+            arg_text = " ".join(str(arg) for arg in args)
+            notes = self.describe(code_object, op, args)
+            output.append(f"{line_col:>5} {pc:>6} {OPNAMES[op]:<14} {arg_text:<20} {f'({notes})' if notes else ''}".rstrip())
+            pc += 1 + len(args)
+        return "\n".join(output)
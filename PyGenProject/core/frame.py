@@ -0,0 +1,64 @@
+from collections.abc import MutableMapping
+
+
+class Unset:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "UNSET"
+
+
+UNSET = Unset()
+
+
+class Frame:
+    __slots__ = ("names", "slots", "values")
+
+    def __init__(self):
+        self.names = []   # slot -> identifier
+        self.slots = {}   # identifier -> slot
+        self.values = []  # slot -> value, UNSET until the variable is assigned
+
+    def slot(self, name):
+        index = self.slots.get(name)
+        if index is None:
+            index = len(self.names)
+            self.slots[name] = index
+            self.names.append(name)
+            self.values.append(UNSET)
+        return index
+
+
+class FrameView(MutableMapping):
+    # Dict-style access to a Frame, for embedding and debugging
+    def __init__(self, frame):
+        self.frame = frame
+
+    def __getitem__(self, name):
+        index = self.frame.slots.get(name)
+        if index is None or self.frame.values[index] is UNSET:
+            raise KeyError(name)
+        return self.frame.values[index]
+
+    def __setitem__(self, name, value):
+        self.frame.values[self.frame.slot(name)] = value
+
+    def __delitem__(self, name):
+        index = self.frame.slots.get(name)
+        if index is None or self.frame.values[index] is UNSET:
+            raise KeyError(name)
+        self.frame.values[index] = UNSET
+
+    def __contains__(self, name):
+        index = self.frame.slots.get(name)
+        return index is not None and self.frame.values[index] is not UNSET
+
+    def __iter__(self):
+        values = self.frame.values
+        return (name for index, name in enumerate(self.frame.names) if values[index] is not UNSET)
+
+    def __len__(self):
+        return sum(1 for value in self.frame.values if value is not UNSET)
+
+    def __repr__(self):
+        return repr(dict(self))
@@ -1,180 +1,180 @@
-from PyGenProject.utils.error_codes import GetError
+import os
+
+from PyGenProject.utils.error_codes import GetError, BudgetExceeded, ProgramStopped
+from PyGenProject.utils.output import StdoutSink
 from tokenizer import Tokenizer
 from commands import Commands
+from parser import Parser
+from resolver import Resolver
+from nodes import Statement, IfNode, WhileNode, ForNode, ParForNode, ErrorNode
+from parallel import ParallelExecutor
+from optimizer import Optimizer
+
+# Streamed pieces are only type-specialized while the frame is smaller than this: the checker's
+# state has an entry for every slot, and generated programs can have one for every literal
+STREAM_SPECIALIZE_SLOTS = 10000
 
 
 class PyGenInterpreter:
-    def __init__(self):
-        self.error_handler = GetError()
+    def __init__(self, output=None, color=True, input_source=None, error_handler=None, workers=None, optimize=True):
+        self.output = output or StdoutSink()
+        self.error_handler = error_handler or GetError(self.output, color)
         self.tokenizer = Tokenizer()
-        self.command = Commands()
+        self.command = Commands(self.output, self.error_handler, input_source)
+        self.parser = Parser(self.tokenizer, self.command.detect_type)
+        self.resolver = Resolver(self.command)
+        self.optimizer = Optimizer(self.command.detect_type, self.tokenizer) if optimize else None
+        self.parallel = ParallelExecutor(self, workers or os.cpu_count() or 1)
+        self.profiler = None  # set by Profiler.attach, which swaps timed wrappers into `dispatch`
+        self.budget = None  # set by Budget.attach, the same way
+        self.diagnostics = None  # set by ErrorCollector.attach, the same way
+        self.dispatch = {
+            Statement: self.execute_statement,
+            IfNode: self.execute_if,
+            WhileNode: self.execute_while,
+            ForNode: self.execute_for,
+            ParForNode: self.execute_parfor,
+            ErrorNode: self.execute_error,
+        }
+
+    def parse(self, lines):
+        return self.resolver.resolve(self.compile_program(lines))
+
+    def compile_program(self, lines):
+        # The unresolved, optimized AST: independent of this interpreter's frame, so it can be cached
+        tree = self.parser.parse(lines)
+        return tree if self.optimizer is None else self.optimizer.optimize(tree)
+
+    def run_compiled(self, tree):
+        try:
+            self.execute_block(self.resolver.resolve(tree))
+        except BudgetExceeded as exceeded:
+            self.report_exceeded(exceeded)
+        except ProgramStopped:
+            pass
+        finally:
+            self.parallel.close()
+            self.output.flush()
+
+    def report_exceeded(self, exceeded):
+        # E025 is reported from an `except BudgetExceeded` clause, so a ProgramStopped raised by a
+        # collector whose policy stops on it would escape the sibling `except ProgramStopped`
+        try:
+            self.error_handler.get_error("E025", limit=exceeded.limit, value=exceeded.value)
+        except ProgramStopped:
+            pass
 
     def run_program(self, lines):
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line or line.startswith("//"):  # Skip empty lines or full comment lines
-                i += 1
-                continue
-            parts = self.tokenizer.tokenize(line)
-            if not parts:
-                i += 1
-                continue
-            cmd = parts[0].upper()
-            if cmd in ("SET", "INPUT", "ADD", "SUB", "MUL", "DIV", "MOD", "CLC", "PRINT", "AND", "OR", "NOT", "XOR"):
-                self.execute_line(line)
-                i += 1
-            elif cmd == "IF":
-                i = self.execute_if(lines, i)
-            elif cmd == "WHILE":  # Added handling for WHILE
-                i = self.execute_while(lines, i)
-            elif cmd == "FOR":  # Added handling for FOR
-                i = self.execute_for(lines, i)
-            else:
-                self.error_handler.get_error("E001", cmd=cmd)
-                i += 1
+        self.run_compiled(self.compile_program(lines))
+
+    def run_stream(self, pieces):
+        # Runs a program piece by piece, as SourceStream yields it: every (first_line, source)
+        # piece ends at the top level and is parsed, optimized, resolved and run before the next
+        # one is read. Straight-line pieces run once, so only pieces with a loop or branch are
+        # type-specialized.
+        assigned = set()
+        try:
+            for first_line, source in pieces:
+                tree = self.parser.parse(source, first_line)
+                if self.optimizer is not None:
+                    assigned |= self.optimizer.written(tree)
+                    tree = self.optimizer.optimize(tree, assigned)
+                specialize = (len(self.command.frame.values) <= STREAM_SPECIALIZE_SLOTS
+                              and any(type(node) is not Statement for node in tree))
+                self.execute_block(self.resolver.resolve(tree, specialize))
+        except BudgetExceeded as exceeded:
+            self.report_exceeded(exceeded)
+        except ProgramStopped:
+            pass
+        finally:
+            self.parallel.close()
+            self.output.flush()
+
+    def execute_block(self, block):
+        dispatch = self.dispatch
+        for node in block:
+            dispatch[type(node)](node)
+
+    def compile_block(self, block):
+        # Pre-binds every node of a block to the callable that executes it. While profiling or
+        # collecting errors, statements also go through `dispatch` so that they are timed or located.
+        handlers = self.command.handlers
+        dispatch = self.dispatch
+        direct = self.profiler is None and self.diagnostics is None
+        return [(handlers[node.op], node.args) if direct and type(node) is Statement
+                else (dispatch[type(node)], (node,)) for node in block]
 
     def execute_line(self, line):
-        if "//" in line:
-            line = line.split("//")[0].strip()
         parts = self.tokenizer.tokenize(line)
         if not parts:
             return
-        cmd = parts[0].upper()
-        if cmd == "SET":
-            self.command.execute_set(parts)
-        elif cmd == "INPUT":
-            self.command.execute_input(parts)
-        elif cmd in ("ADD", "SUB", "MUL", "DIV", "MOD"):
-            self.command.execute_arithmetic(cmd, parts)
-        elif cmd == "CLC":
-            self.command.execute_clc(parts)
-        elif cmd == "PRINT":
-            self.command.execute_print(parts)
-        elif cmd in ("AND", "OR", "NOT", "XOR"):
-            self.command.execute_logical(cmd, parts)
-        else:
-            self.error_handler.get_error("E001", cmd=cmd)
-
-    def execute_if(self, lines, start_index):
-        current_line = lines[start_index].strip()
-        parts = self.tokenizer.tokenize(current_line)
-        if parts[0].upper() != "IF" or "THEN" not in [p.upper() for p in parts]:
-            self.error_handler.get_error("E014")  # E014: Invalid IF syntax
-            return start_index + 1
-        then_index = [p.upper() for p in parts].index("THEN")
-        condition_parts = parts[1:then_index]
-        condition_str = " ".join(condition_parts)
-        blocks = {"if": [], "elifs": [], "else": []}
-        current_block = "if"
-        i = start_index + 1
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line or line.startswith("//"):
-                i += 1
+        self.execute_statement(self.resolver.resolve([Statement(0, parts[0].upper(), parts)])[0])
+
+    def execute_statement(self, node):
+        self.command.handlers[node.op](*node.args)
+
+    def execute_error(self, node):
+        self.error_handler.get_error(node.code, **node.kwargs)
+
+    def execute_if(self, node):
+        values = self.command.frame.values
+        error = self.command.error_handler.get_error
+        for evaluate, (_, block) in zip(node.evaluators, node.branches):
+            if evaluate is None:
+                self.error_handler.get_error("E014")  # ELIF without THEN
                 continue
-            upper_line = line.upper()
-            if upper_line.startswith("ENDIF"):
-                break
-            elif upper_line.startswith("ELIF"):
-                elif_parts = self.tokenizer.tokenize(line)
-                then_index = [p.upper() for p in elif_parts].index("THEN")
-                elif_condition = " ".join(elif_parts[1:then_index])
-                blocks["elifs"].append({"condition": elif_condition, "block": []})
-                current_block = f"elif_{len(blocks['elifs']) - 1}"
-            elif upper_line.startswith("ELSE"):
-                blocks["else"] = []
-                current_block = "else"
-            else:
-                if current_block == "if":
-                    blocks["if"].append(line)
-                elif current_block.startswith("elif_"):
-                    idx = int(current_block.split("_")[1])
-                    blocks["elifs"][idx]["block"].append(line)
-                elif current_block == "else":
-                    blocks["else"].append(line)
-            i += 1
-        if i >= len(lines) or not lines[i].strip().upper().startswith("ENDIF"):
-            self.error_handler.get_error("E015")  # E015: Missing ENDIF
-            return i
-        executed = False
-        if self.command.evaluate_condition(condition_str):
-            self.run_program(blocks["if"])
-            executed = True
-        if not executed:
-            for elif_block in blocks["elifs"]:
-                if self.command.evaluate_condition(elif_block["condition"]):
-                    self.run_program(elif_block["block"])
-                    executed = True
-                    break
-        if not executed and blocks["else"]:
-            self.run_program(blocks["else"])
-        return i + 1
-
-    def execute_for(self, lines, start_index):
-        current_line = lines[start_index].strip()
-        parts = self.tokenizer.tokenize(current_line)
-        if parts[0].upper() != "FOR" or "DO" not in [p.upper() for p in parts]:
-            self.error_handler.get_error("E018")
-            return start_index + 1
-        var = parts[1]
-        from_index = next((idx for idx, p in enumerate(parts) if p.upper() == "FROM"), -1)
-        to_index = next((idx for idx, p in enumerate(parts) if p.upper() == "TO"), -1)
-        step_index = next((idx for idx, p in enumerate(parts) if p.upper() == "STEP"), -1)
-        do_index = next((idx for idx, p in enumerate(parts) if p.upper() == "DO"), -1)
-        if from_index == -1 or to_index == -1 or do_index == -1:
-            self.error_handler.get_error("E018")
-            return start_index + 1
-        start_val = self.command.detect_type(parts[from_index + 1])
-        end_val = self.command.detect_type(parts[to_index + 1])
-        step_val = self.command.detect_type(parts[step_index + 1]) if step_index != -1 else 1
+            if evaluate(values, error):
+                self.execute_block(block)
+                return
+        if node.else_block:
+            self.execute_block(node.else_block)
+
+    def execute_for(self, node):
+        start_val, end_val, step_val = node.start, node.end, node.step
         if not all(isinstance(val, (int, float)) for val in [start_val, end_val, step_val]):
             self.error_handler.get_error("E019")
-            return start_index + 1
-        block = []
-        i = start_index + 1
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line or line.startswith("//"):
-                i += 1
-                continue
-            if line.upper().startswith("ENDFOR"):
-                break
-            block.append(line)
-            i += 1
-        if i >= len(lines) or not lines[i].strip().upper().startswith("ENDFOR"):
-            self.error_handler.get_error("E020")
-            return i
-        self.command.variables[var] = start_val
-        while ((step_val > 0 and self.command.variables[var] <= end_val) or
-               (step_val < 0 and self.command.variables[var] >= end_val)):
-            self.run_program(block)
-            self.command.variables[var] += step_val
-        return i + 1
-
-    def execute_while(self, lines, start_index):
-        current_line = lines[start_index].strip()
-        parts = self.tokenizer.tokenize(current_line)
-        if parts[0].upper() != "WHILE" or "DO" not in [p.upper() for p in parts]:
-            self.error_handler.get_error("E016")
-            return start_index + 1
-        do_index = [p.upper() for p in parts].index("DO")
-        condition_parts = parts[1:do_index]
-        condition_str = " ".join(condition_parts)
-        block = []
-        i = start_index + 1
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line or line.startswith("//"):
-                i += 1
-                continue
-            if line.upper().startswith("ENDWHILE"):
-                break
-            block.append(line)
-            i += 1
-        if i >= len(lines) or not lines[i].strip().upper().startswith("ENDWHILE"):
-            self.error_handler.get_error("E017")
-            return i
-        while self.command.evaluate_condition(condition_str):
-            self.run_program(block)
-        return i + 1
+            return
+        slot = node.slot
+        values = self.command.frame.values
+        if node.reduction is not None and node.reduction.run(values):
+            return
+        if node.counted:
+            self.execute_counted_for(node, values)
+            return
+        values[slot] = start_val
+        while ((step_val > 0 and values[slot] <= end_val) or
+               (step_val < 0 and values[slot] >= end_val)):
+            self.execute_block(node.block)
+            values[slot] += step_val
+
+    def execute_counted_for(self, node, values):
+        # Same iterations as the general loop; afterwards the variable holds the first value past the end
+        slot, step_val = node.slot, node.step
+        stop = node.end + 1 if step_val > 0 else node.end - 1
+        value = None
+        steps = self.compile_block(node.block)
+        for value in range(node.start, stop, step_val):
+            values[slot] = value
+            for run, args in steps:
+                run(*args)
+        values[slot] = node.start if value is None else value + step_val
+
+    def execute_parfor(self, node):
+        # Small loops, loops with a closed form and reductions that would report errors run in
+        # this process exactly like FOR; everything else is split across the worker pool
+        frame = self.command.frame
+        series = range(node.start, node.end + 1 if node.step > 0 else node.end - 1, node.step)
+        if (self.parallel.workers < 2 or len(series) < 2 or node.reduction is not None
+                or not self.parallel.accepts(node, frame.values, frame)):
+            self.execute_for(node)
+            return
+        self.parallel.run(node, series)
+
+    def execute_while(self, node):
+        evaluate = node.evaluate
+        values = self.command.frame.values
+        if node.reduction is not None and node.reduction.run(values):
+            return
+        error = self.command.error_handler.get_error
+        while evaluate(values, error):
+            self.execute_block(node.block)
@@ -0,0 +1,74 @@
+class Node:
+    def __init__(self, line):
+        self.line = line
+
+
+class Statement(Node):
+    def __init__(self, line, cmd, parts):
+        super().__init__(line)
+        self.cmd = cmd
+        self.parts = parts
+        self.op = None  # set by the Resolver: Commands operation name and its slot-indexed arguments
+        self.args = ()
+
+    def __reduce__(self):
+        # Only the parsed fields are pickled, so resolved nodes travel to cache files and workers
+        return Statement, (self.line, self.cmd, self.parts)
+
+
+class IfNode(Node):
+    def __init__(self, line, branches, else_block):
+        super().__init__(line)
+        # branches: list of (condition_str, block); condition_str is None for a malformed ELIF
+        self.branches = branches
+        self.else_block = else_block
+        self.evaluators = []  # compiled branch conditions, set by the Resolver
+
+    def __reduce__(self):
+        return IfNode, (self.line, self.branches, self.else_block)
+
+
+class WhileNode(Node):
+    def __init__(self, line, condition, block):
+        super().__init__(line)
+        self.condition = condition
+        self.block = block
+        self.evaluate = None
+        self.reduction = None  # closed-form replacement for the loop, set by the Resolver
+
+    def __reduce__(self):
+        return WhileNode, (self.line, self.condition, self.block)
+
+
+class ForNode(Node):
+    def __init__(self, line, var, start, end, step, block):
+        super().__init__(line)
+        self.var = var
+        self.start = start
+        self.end = end
+        self.step = step
+        self.block = block
+        self.slot = None
+        self.counted = False  # integer bounds and a body that never assigns the loop variable
+        self.reduction = None
+
+    def __reduce__(self):
+        return ForNode, (self.line, self.var, self.start, self.end, self.step, self.block)
+
+
+class ParForNode(ForNode):
+    def __init__(self, line, var, start, end, step, reductions, block):
+        super().__init__(line, var, start, end, step, block)
+        self.reductions = reductions  # list of (ADD|MUL|AND|OR, variable)
+        self.privates = []  # variables every iteration assigns before using them, set by the Parser
+
+    def __reduce__(self):
+        return (ParForNode, (self.line, self.var, self.start, self.end, self.step, self.reductions, self.block),
+                {"privates": self.privates})
+
+
+class ErrorNode(Node):
+    def __init__(self, line, code, **kwargs):
+        super().__init__(line)
+        self.code = code
+        self.kwargs = kwargs
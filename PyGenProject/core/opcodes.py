@@ -0,0 +1,50 @@
+LOAD_VALUE = 0             # name const        push variables[name] if defined, else consts[const]
+LOAD_CONST = 1             # const             push consts[const]
+STORE = 2                  # name              variables[name] = pop()
+INPUT = 3                  # name              read a value from the user into variables[name]
+ARITH = 4                  # kind name         variables[name] <kind>= pop()
+CLC = 5                    # target left right kind op
+PRINT = 6                  # count             print the top `count` values
+LOGIC = 7                  # kind name vname vconst
+NOT = 8                    # name
+COMPARE = 9                # lname lconst rname rconst op negate
+JUMP_IF_FALSE_OR_POP = 10  # target  short-circuit AND: keep a false result and jump, else pop it
+JUMP_IF_TRUE_OR_POP = 11   # target  short-circuit OR: keep a true result and jump, else pop it
+JUMP = 12                  # target
+JUMP_IF_FALSE = 13         # target
+FOR_INIT = 14              # name start
+FOR_ITER = 15              # name end step target    jump to target once the loop is finished
+FOR_STEP = 16              # name step
+ERROR = 17                 # code kwargs
+ARRAY_NEW = 18             # name              variables[name] = a new array; pops the initial value, then the size
+GET_ITEM = 19              # name aname        variables[name] = variables[aname][pop()]
+PUT_ITEM = 20              # aname             pops the value, then the index, and stores into the array
+ARRAY_LEN = 21             # name aname
+ARRAY_REDUCE = 22          # kind name aname   variables[name] = SUM/MIN/MAX of variables[aname]
+
+OPNAMES = [
+    "LOAD_VALUE", "LOAD_CONST", "STORE", "INPUT", "ARITH", "CLC", "PRINT", "LOGIC", "NOT",
+    "COMPARE", "JUMP_IF_FALSE_OR_POP", "JUMP_IF_TRUE_OR_POP", "JUMP", "JUMP_IF_FALSE",
+    "FOR_INIT", "FOR_ITER", "FOR_STEP", "ERROR",
+    "ARRAY_NEW", "GET_ITEM", "PUT_ITEM", "ARRAY_LEN", "ARRAY_REDUCE",
+]
+
+ARITY = [2, 1, 1, 1, 2, 5, 1, 4, 1, 6, 1, 1, 1, 1, 2, 4, 2, 2, 1, 2, 1, 2, 3]
+
+ARITH_KINDS = ["ADD", "SUB", "MUL", "DIV", "MOD"]
+LOGIC_KINDS = ["AND", "OR", "XOR"]
+REDUCE_KINDS = ["SUM", "MIN", "MAX"]
+
+# Operand positions (by opcode) that hold an index into the names / consts pools or a jump target
+NAME_OPERANDS = {
+    LOAD_VALUE: (0,), STORE: (0,), INPUT: (0,), ARITH: (1,), CLC: (0, 1, 2), LOGIC: (1, 2),
+    NOT: (0,), COMPARE: (0, 2), FOR_INIT: (0,), FOR_ITER: (0,), FOR_STEP: (0,),
+    ARRAY_NEW: (0,), GET_ITEM: (0, 1), PUT_ITEM: (0,), ARRAY_LEN: (0, 1), ARRAY_REDUCE: (1, 2),
+}
+CONST_OPERANDS = {
+    LOAD_VALUE: (1,), LOAD_CONST: (0,), CLC: (4,), LOGIC: (3,), COMPARE: (1, 3, 4),
+    FOR_INIT: (1,), FOR_ITER: (1, 2), FOR_STEP: (1,), ERROR: (0, 1),
+}
+JUMP_OPERANDS = {
+    JUMP: 0, JUMP_IF_FALSE: 0, JUMP_IF_FALSE_OR_POP: 0, JUMP_IF_TRUE_OR_POP: 0, FOR_ITER: 3,
+}
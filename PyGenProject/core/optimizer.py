@@ -0,0 +1,316 @@
+from tokenizer import Tokenizer
+from conditions import ConditionCompiler
+from frame import Frame
+from nodes import Statement, IfNode, WhileNode, ForNode, ParForNode
+
+ARITHMETIC = ("ADD", "SUB", "MUL", "DIV", "MOD")
+LOGICAL = ("AND", "OR", "XOR")
+ARRAYS = ("ARRAY", "GET", "LEN", "SUM", "MIN", "MAX")
+# Commands whose first operand is the variable they assign
+WRITES = ("SET", "INPUT", "CLC", "NOT") + ARITHMETIC + LOGICAL + ARRAYS
+MAX_DIGITS = 4000  # longer ints cannot be read back from their decimal text
+
+
+class Optimizer:
+    # Source-level optimizer for parsed programs: propagates constants, folds SET/arithmetic/CLC/
+    # logical statements on known values into SET with a literal, substitutes known values in
+    # PRINT, prunes IF branches whose conditions are decided and drops loops that never run.
+    # Values follow Commands.detect_type and the comparison rules of ConditionCompiler, and
+    # statements that would report an error are left alone so the error still happens.
+    # Variables start unknown, since they may be bound before the run; literal tokens are taken
+    # at their face value unless the program assigns them.
+    def __init__(self, detect_type, tokenizer=None):
+        self.detect_type = detect_type
+        self.tokenizer = tokenizer or Tokenizer()
+        self.conditions = ConditionCompiler(Frame(), detect_type, self.tokenizer)
+        self.assigned = set()
+
+    def optimize(self, tree, assigned=None):
+        # `assigned` replaces the names written by `tree` when a program is optimized piece by
+        # piece; it must include them, and every name written by the pieces before
+        self.assigned = self.written(tree) if assigned is None else assigned
+        return self.block(tree, {})
+
+    def written(self, block):
+        # Every name the block may assign, including nested blocks
+        names = set()
+        for node in block:
+            if isinstance(node, Statement):
+                if node.cmd in WRITES and len(node.parts) > 1:
+                    names.add(node.parts[1])
+            elif isinstance(node, IfNode):
+                for _, branch in node.branches:
+                    names |= self.written(branch)
+                names |= self.written(node.else_block)
+            elif isinstance(node, WhileNode):
+                names |= self.written(node.block)
+            elif isinstance(node, ForNode):
+                names.add(node.var)
+                names |= self.written(node.block)
+        return names
+
+    # Values: `state` maps names to their known values; anything else is unknown (None)
+
+    def value(self, token, state):
+        # A variable, or the literal the token stands for while the variable is unset
+        if token in state:
+            return state[token]
+        if token in self.assigned:
+            return None
+        literal = self.detect_type(token)
+        if isinstance(literal, str) and not (token.startswith('"') and token.endswith('"')):
+            return None  # an identifier, which may be bound before the run
+        return literal
+
+    def literal(self, value):
+        # The token that reads back as exactly `value`, or None
+        if isinstance(value, bool):
+            token = "TRUE" if value else "FALSE"
+        elif isinstance(value, int):
+            token = str(value) if len(str(abs(value))) <= MAX_DIGITS else None
+        elif isinstance(value, float):
+            token = repr(value)
+        elif isinstance(value, str) and '"' not in value:
+            token = f'"{value}"'
+        else:
+            token = None
+        if token is None or token in self.assigned:
+            return None
+        parsed = self.detect_type(token)
+        if type(parsed) is not type(value) or parsed != value:
+            return None  # NaN, or text that parses as something else
+        return token
+
+    def same(self, first, second):
+        return type(first) is type(second) and first == second
+
+    def merge(self, states):
+        first = states[0]
+        return {name: value for name, value in first.items()
+                if all(name in state and self.same(state[name], value) for state in states[1:])}
+
+    def forget(self, state, names):
+        for name in names:
+            state.pop(name, None)
+
+    # Conditions
+
+    def decide(self, condition, state):
+        # True or False when the condition is decided without errors, None otherwise
+        if condition is None:
+            return None
+        expressions, operators = self.conditions.split(self.tokenizer.tokenize(condition))
+        if not expressions or len(expressions) != len(operators) + 1:
+            return None
+        result = self.compare(expressions[0], state)
+        for op, expr_parts in zip(operators, expressions[1:]):
+            if result is None:
+                return None
+            if (op == "AND") == bool(result):  # not short-circuited
+                result = self.compare(expr_parts, state)
+        return result
+
+    def compare(self, expr_parts, state):
+        not_flag = False
+        if expr_parts and expr_parts[0].upper() == "NOT":
+            not_flag = True
+            expr_parts = expr_parts[1:]
+        if len(expr_parts) != 3:
+            return None
+        left, op, right = expr_parts
+        compare = ConditionCompiler.COMPARISONS.get(op)
+        a, b = self.value(left, state), self.value(right, state)
+        if compare is None or a is None or b is None:
+            return None
+        if not (isinstance(a, (int, float, bool, str)) and isinstance(b, type(a))):
+            return None
+        result = compare(a, b)
+        return not result if not_flag else result
+
+    # Blocks
+
+    def block(self, block, state):
+        result = []
+        for node in block:
+            if isinstance(node, Statement):
+                result.append(self.statement(node, state))
+            elif isinstance(node, IfNode):
+                result.extend(self.if_node(node, state))
+            elif isinstance(node, WhileNode):
+                result.extend(self.while_node(node, state))
+            elif isinstance(node, ForNode):
+                result.extend(self.for_node(node, state))
+            else:
+                result.append(node)
+        return result
+
+    def if_node(self, node, state):
+        if any(condition is None for condition, _ in node.branches):
+            # A malformed ELIF reports E014 when it is reached; only the branch bodies are optimized
+            states = [dict(state) for _ in node.branches] + [dict(state)]
+            branches = [(condition, self.block(branch, branch_state))
+                        for (condition, branch), branch_state in zip(node.branches, states)]
+            node = IfNode(node.line, branches, self.block(node.else_block, states[-1]))
+            self.replace(state, self.merge(states))
+            return [node]
+        branches = []
+        else_block = node.else_block
+        for condition, branch in node.branches:
+            decided = self.decide(condition, state)
+            if decided is False:
+                continue
+            if decided is True:
+                else_block = branch
+                break
+            branches.append((condition, branch))
+        if not branches:
+            return self.block(else_block, state)
+        states = []
+        optimized = []
+        for condition, branch in branches:
+            branch_state = dict(state)
+            optimized.append((condition, self.block(branch, branch_state)))
+            states.append(branch_state)
+        else_state = dict(state)
+        else_block = self.block(else_block, else_state)
+        states.append(else_state)
+        self.replace(state, self.merge(states))
+        return [IfNode(node.line, optimized, else_block)]
+
+    def replace(self, state, new_state):
+        state.clear()
+        state.update(new_state)
+
+    def while_node(self, node, state):
+        if self.decide(node.condition, state) is False:
+            return []
+        self.forget(state, self.written(node.block))
+        block = self.block(node.block, dict(state))
+        return [WhileNode(node.line, node.condition, block)]
+
+    def for_node(self, node, state):
+        start, end, step = node.start, node.end, node.step
+        if not all(isinstance(val, (int, float)) for val in (start, end, step)):
+            return [node]  # E019 at runtime
+        if (step > 0 and start > end) or (step < 0 and start < end) or step == 0:
+            # The loop never runs but still assigns its start value to the variable
+            state[node.var] = start
+            token = self.literal(start)
+            if token is None:
+                return [node]
+            return [Statement(node.line, "SET", ["SET", node.var, token])]
+        self.forget(state, self.written(node.block) | {node.var})
+        block = self.block(node.block, dict(state))
+        if isinstance(node, ParForNode):
+            optimized = ParForNode(node.line, node.var, start, end, step, node.reductions, block)
+            optimized.privates = node.privates
+            return [optimized]
+        return [ForNode(node.line, node.var, start, end, step, block)]
+
+    # Statements
+
+    def statement(self, node, state):
+        cmd, parts = node.cmd, node.parts
+        target = parts[1] if len(parts) > 1 else None
+        if cmd == "SET" and len(parts) >= 3:
+            return self.assign(node, state, target, self.value(parts[2], state), parts[2])
+        if cmd in ("INPUT",) + ARRAYS and len(parts) >= 2:
+            state.pop(target, None)  # arrays and their elements are not tracked
+        elif cmd in ARITHMETIC and len(parts) >= 3:
+            return self.fold(node, state, target, self.arithmetic(cmd, state.get(target), self.value(parts[2], state)))
+        elif cmd == "CLC" and len(parts) == 5:
+            return self.fold(node, state, target, self.clc(state.get(parts[2]), parts[3], state.get(parts[4])))
+        elif cmd in LOGICAL and len(parts) >= 3:
+            return self.fold(node, state, target, self.logical(cmd, state.get(target), self.logical_operand(parts[2], state)))
+        elif cmd == "NOT" and len(parts) == 2:
+            current = state.get(target)
+            return self.fold(node, state, target, not current if isinstance(current, bool) else None)
+        elif cmd == "PRINT":
+            return self.print_node(node, state)
+        return node
+
+    def assign(self, node, state, target, value, source):
+        if value is None:
+            state.pop(target, None)
+            return node
+        state[target] = value
+        token = self.literal(value)
+        if token is None or token == source:
+            return node
+        return Statement(node.line, "SET", ["SET", target, token])
+
+    def fold(self, node, state, target, value):
+        # `value` is the statement's result when it is known and error-free; otherwise the target
+        # keeps a known value only if the statement certainly fails
+        if value is not None:
+            return self.assign(node, state, target, value, None)
+        if not self.fails(node, state):
+            state.pop(target, None)
+        return node
+
+    def fails(self, node, state):
+        # Known operands that make the statement report an error, which leaves its target unchanged
+        cmd, parts = node.cmd, node.parts
+        current = state.get(parts[1])
+        if cmd in ARITHMETIC:
+            operand = self.value(parts[2], state)
+            return (current is not None and not isinstance(current, (int, float))) or (
+                current is not None and operand is not None and not isinstance(operand, (int, float)))
+        if cmd in LOGICAL or cmd == "NOT":
+            return current is not None and not isinstance(current, bool)
+        return False
+
+    def arithmetic(self, cmd, current, value):
+        if not isinstance(current, (int, float)) or not isinstance(value, (int, float)):
+            return None
+        return self.calculate(cmd, current, value)
+
+    def clc(self, a, op, b):
+        if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+            return None
+        return self.calculate(op, a, b)
+
+    def calculate(self, op, a, b):
+        if op in ("DIV", "MOD") and b == 0:
+            return None  # E004, or ZeroDivisionError for MOD
+        if op == "ADD":
+            return a + b
+        if op == "SUB":
+            return a - b
+        if op == "MUL":
+            return a * b
+        if op == "DIV":
+            return a / b
+        if op == "MOD":
+            return a % b
+        return None
+
+    def logical_operand(self, token, state):
+        # Like Commands.resolve: an unset operand is only accepted as a TRUE/FALSE literal
+        if token in state:
+            return state[token]
+        if token in self.assigned or token.lower() not in ("true", "false"):
+            return None
+        return token.lower() == "true"
+
+    def logical(self, cmd, current, value):
+        if not isinstance(current, bool) or value is None:
+            return None
+        if cmd == "AND":
+            return current and value
+        if cmd == "OR":
+            return current or value
+        return (current and not value) or (not current and value)
+
+    def print_node(self, node, state):
+        parts = [node.parts[0]]
+        for token in node.parts[1:]:
+            value = state.get(token)
+            text = None if value is None else str(value)
+            if text is not None and '"' not in text and not (token.startswith('"') and token.endswith('"')):
+                parts.append(f'"{text}"')
+            else:
+                parts.append(token)
+        if parts == node.parts:
+            return node
+        return Statement(node.line, node.cmd, parts)
@@ -0,0 +1,238 @@
+from multiprocessing import Pool
+
+from PyGenProject.utils.error_codes import GetError, ProgramStopped, ProgramError
+from PyGenProject.utils.inputs import IterableInput
+from PyGenProject.utils.output import MemorySink
+from nodes import Statement, IfNode, WhileNode, ForNode, ErrorNode
+from frame import UNSET
+from diagnostics import ErrorCollector
+
+# Commands a REDUCE variable may appear in, and the value every chunk starts it from
+REDUCTION_COMMANDS = {"ADD": ("ADD", "SUB"), "MUL": ("MUL",), "AND": ("AND",), "OR": ("OR",)}
+IDENTITIES = {"ADD": 0, "MUL": 1, "AND": True, "OR": False}
+
+
+def merge(op, total, partial):
+    if op == "ADD":
+        return total + partial
+    if op == "MUL":
+        return total * partial
+    if op == "AND":
+        return total and partial
+    return total or partial
+
+
+class ParForChecker:
+    # Rejects PARFOR bodies whose iterations could interfere. Every variable the body writes must
+    # be the target of a REDUCE clause, or private: assigned at the top level of the body before
+    # any use, so each iteration starts it afresh. The assignment that makes a variable private
+    # must not fail in one iteration and succeed in another, or that iteration would see, and
+    # might leave behind, a value from another chunk: it is a SET, an ARRAY whose operands are
+    # the same in every iteration, or a FOR loop.
+    def check(self, node):
+        self.reductions = {name: op for op, name in node.reductions}
+        self.seen = set()
+        self.privates = set()
+        self.arrays = set()  # private variables that hold an array created in the body
+        self.var = node.var
+        error = self.visit(node.block, True)
+        node.privates = sorted(self.privates)
+        return error
+
+    def uses(self, cmd, parts):
+        # (read names, written names) of one statement
+        if cmd == "SET":
+            return parts[2:3], parts[1:2]
+        if cmd in ("ADD", "SUB", "MUL", "DIV", "MOD", "AND", "OR", "XOR"):
+            return parts[1:3], parts[1:2]
+        if cmd == "NOT":
+            return parts[1:2], parts[1:2]
+        if cmd == "CLC":
+            return parts[2:3] + parts[4:5], parts[1:2]
+        if cmd == "PRINT":
+            return [token for token in parts[1:] if not token.startswith('"')], []
+        if cmd in ("ARRAY", "GET"):
+            return parts[2:4], parts[1:2]
+        if cmd in ("LEN", "SUM", "MIN", "MAX"):
+            return parts[2:3], parts[1:2]
+        if cmd == "PUT":
+            return parts[1:4], []
+        return [], []
+
+    def read(self, names, line):
+        for name in names:
+            if name in self.reductions:
+                return ErrorNode(line, "E023", var=name)
+            self.seen.add(name)
+        return None
+
+    def defines(self, cmd, parts):
+        # Whether the statement assigns its target in every iteration, or fails in every iteration
+        if cmd == "SET":
+            return len(parts) >= 3
+        if cmd == "ARRAY":
+            return len(parts) >= 4 and not any(name == self.var or name in self.privates for name in parts[2:4])
+        return False
+
+    def write(self, name, top, line, defines=True):
+        if name in self.privates:
+            return None
+        if name == self.var or name in self.reductions or name in self.seen or not top or not defines:
+            return ErrorNode(line, "E023", var=name)
+        self.privates.add(name)
+        self.seen.add(name)
+        return None
+
+    def visit(self, block, top):
+        for node in block:
+            error = None
+            if isinstance(node, Statement):
+                error = self.visit_statement(node, top)
+            elif isinstance(node, IfNode):
+                for condition, branch in node.branches:
+                    error = error or self.read((condition or "").split(), node.line) or self.visit(branch, False)
+                error = error or self.visit(node.else_block, False)
+            elif isinstance(node, WhileNode):
+                error = self.read(node.condition.split(), node.line) or self.visit(node.block, False)
+            elif isinstance(node, ForNode):
+                error = self.write(node.var, top, node.line) or self.visit(node.block, False)
+            if error is not None:
+                return error
+        return None
+
+    def visit_statement(self, node, top):
+        cmd, parts = node.cmd, node.parts
+        if cmd == "INPUT":
+            return ErrorNode(node.line, "E024")
+        if len(parts) > 1 and parts[1] in self.reductions:
+            # The accumulating statement of a REDUCE variable is the only place it may appear
+            if cmd not in REDUCTION_COMMANDS[self.reductions[parts[1]]]:
+                return ErrorNode(node.line, "E023", var=parts[1])
+            return self.read(parts[2:3], node.line)
+        if cmd == "PUT" and len(parts) > 1 and parts[1] not in self.arrays:
+            # Every worker changes its own copy of an array from outside the loop
+            return ErrorNode(node.line, "E023", var=parts[1])
+        reads, writes = self.uses(cmd, parts)
+        error = self.read(reads, node.line)
+        defines = self.defines(cmd, parts)
+        for name in writes:
+            error = error or self.write(name, top, node.line, defines)
+            if cmd == "ARRAY" and top:
+                self.arrays.add(name)
+            else:
+                self.arrays.discard(name)
+        return error
+
+
+class ChunkErrors(ErrorCollector):
+    # The error handler of a PARFOR chunk when the program runs with an ErrorCollector: it applies
+    # the program's policy, but prints nothing. Every error it found is returned with the number
+    # of output lines before its first occurrence, so the parent collector reports it in place.
+    def __init__(self, output, policy, default):
+        super().__init__(output, False, policy, default)
+        self.positions = []
+
+    def write(self, message):
+        self.positions.append(len(self.output.lines))
+
+    def located(self):
+        return list(zip(self.positions, self.diagnostics.values()))
+
+
+def run_chunk(task):
+    # Runs one slice of a PARFOR range in a fresh interpreter of this worker process and returns
+    # its output lines, the partial value of every reduction, the final private values and the
+    # errors collected under `policy` ((policy, default) of the program's ErrorCollector, or None)
+    engine, color, node, variables, chunk, policy = task
+    output = MemorySink()
+    errors = GetError(output, color) if policy is None else ChunkErrors(output, *policy)
+    interpreter = engine(output, color, IterableInput(()), errors, workers=1)
+    if policy is not None:
+        errors.attach(interpreter)
+    interpreter.command.variables.update(variables)
+    for op, name in node.reductions:
+        interpreter.command.variables[name] = IDENTITIES[op]
+    block = interpreter.resolver.resolve(node.block, specialize=False)  # the block runs many times
+    frame = interpreter.command.frame
+    values = frame.values
+    slot = frame.slot(node.var)
+    execute_block = interpreter.execute_block
+    try:
+        for value in range(*chunk):
+            values[slot] = value
+            execute_block(block)
+    except (ProgramStopped, ProgramError):
+        pass  # the parent stops or raises again when it merges the error
+    partials = [values[frame.slot(name)] for _, name in node.reductions]
+    privates = {name: values[frame.slot(name)] for name in node.privates if values[frame.slot(name)] is not UNSET}
+    return output.lines, partials, privates, [] if policy is None else errors.located()
+
+
+class ParallelExecutor:
+    # Splits PARFOR ranges across a process pool that lives as long as one program run
+    CHUNKS_PER_WORKER = 4
+
+    def __init__(self, interpreter, workers):
+        self.interpreter = interpreter
+        self.workers = workers
+        self.pool = None
+
+    def accepts(self, node, values, frame):
+        # Reduction variables must already hold a value their operation accepts; otherwise the
+        # loop runs sequentially and reports errors exactly like a FOR loop
+        for op, name in node.reductions:
+            value = values[frame.slot(name)]
+            if op in ("AND", "OR"):
+                if not isinstance(value, bool):
+                    return False
+            elif value is UNSET or not isinstance(value, (int, float)):
+                return False
+        return True
+
+    def chunks(self, series):
+        count = min(len(series), self.workers * self.CHUNKS_PER_WORKER)
+        for index in range(count):
+            part = series[index * len(series) // count:(index + 1) * len(series) // count]
+            yield part.start, part.stop, part.step
+
+    def run(self, node, series):
+        interpreter = self.interpreter
+        command = interpreter.command
+        frame = command.frame
+        variables = dict(command.variables)
+        engine = type(interpreter)
+        error_handler = interpreter.error_handler
+        color = error_handler.color
+        # An ErrorCollector is recognized by merge(): main.py and this module import it under different names
+        merge_errors = getattr(error_handler, "merge", None)
+        policy = None if merge_errors is None else (error_handler.policy, error_handler.default)
+        tasks = [(engine, color, node, variables, chunk, policy) for chunk in self.chunks(series)]
+        if self.pool is None:
+            self.pool = Pool(self.workers)
+        results = self.pool.map(run_chunk, tasks)
+
+        values = frame.values
+        write_line = interpreter.output.write_line
+        for lines, partials, _, errors in results:
+            # A chunk's errors are merged where they happened, between its output lines; an error
+            # whose policy stops or raises ends the run there, as it would have sequentially
+            written = 0
+            for position, diagnostic in errors:
+                for line in lines[written:position]:
+                    write_line(line)
+                written = position
+                merge_errors(diagnostic)
+            for line in lines[written:]:
+                write_line(line)
+            for (op, name), partial in zip(node.reductions, partials):
+                slot = frame.slot(name)
+                values[slot] = merge(op, values[slot], partial)
+        for name, value in results[-1][2].items():
+            values[frame.slot(name)] = value
+        values[frame.slot(node.var)] = series[-1] + series.step
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
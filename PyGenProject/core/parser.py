@@ -0,0 +1,158 @@
+from tokenizer import Tokenizer
+from commands import Commands
+from nodes import Statement, IfNode, WhileNode, ForNode, ParForNode, ErrorNode
+from parallel import ParForChecker, REDUCTION_COMMANDS
+
+
+class Parser:
+    def __init__(self, tokenizer=None, detect_type=None):
+        self.tokenizer = tokenizer or Tokenizer()
+        self.detect_type = detect_type or Commands().detect_type
+        self.lines = []
+        self.pos = 0
+        self.rejected = []  # E023/E024 errors of PARFOR bodies that cannot run in parallel
+
+    def parse(self, source, first_line=1):
+        # Accepts the whole source text, or a list of lines as returned by readlines()
+        if not isinstance(source, str):
+            source = "\n".join(line.rstrip("\r\n") for line in source)
+        self.lines = self.tokenizer.tokenize_source(source, first_line)
+        self.pos = 0
+        self.rejected = []
+        block = self.parse_block(frozenset())
+        if self.rejected:
+            # An unsafe PARFOR rejects the whole program: none of it runs, and the errors are
+            # reported with their lines, like errors found before a run
+            for error in self.rejected:
+                error.kwargs["line"] = error.line
+            return self.rejected
+        return block
+
+    def parse_block(self, stop):
+        # Parses statements until a keyword in `stop` closes the block (or the input ends)
+        block = []
+        while self.pos < len(self.lines):
+            number, parts = self.lines[self.pos]
+            cmd = parts[0].upper()
+            if cmd in stop:
+                break
+            if cmd == "IF":
+                block.append(self.parse_if(number, parts, stop))
+            elif cmd == "WHILE":
+                block.append(self.parse_while(number, parts, stop))
+            elif cmd == "FOR":
+                block.append(self.parse_for(number, parts, stop))
+            elif cmd == "PARFOR":
+                block.append(self.parse_parfor(number, parts, stop))
+            else:
+                block.append(Statement(number, cmd, parts))
+                self.pos += 1
+        return block
+
+    def block_closer(self, parts):
+        # The keyword that ends the block a line opens, or None when parse_block would not nest a
+        # block there (a malformed IF/WHILE/FOR header is reported on its own line)
+        upper = [p.upper() for p in parts]
+        if upper[0] == "IF":
+            return "ENDIF" if "THEN" in upper else None
+        if upper[0] == "WHILE":
+            return "ENDWHILE" if "DO" in upper else None
+        if upper[0] == "FOR":
+            indexes = [upper.index(word) if word in upper else -1 for word in ("FROM", "TO", "STEP", "DO")]
+            if -1 in (indexes[0], indexes[1], indexes[3]) or max(indexes[:3]) + 1 >= len(parts):
+                return None
+            return "ENDFOR"
+        if upper[0] == "PARFOR":
+            return "ENDPARFOR"
+        return None
+
+    def at_keyword(self, keyword):
+        return self.pos < len(self.lines) and self.lines[self.pos][1][0].upper() == keyword
+
+    def condition_before(self, parts, keyword):
+        upper = [p.upper() for p in parts]
+        if keyword not in upper:
+            return None
+        return " ".join(parts[1:upper.index(keyword)])
+
+    def parse_if(self, number, parts, stop):
+        self.pos += 1
+        condition = self.condition_before(parts, "THEN")
+        if condition is None:
+            return ErrorNode(number, "E014")  # E014: Invalid IF syntax
+        inner = stop | {"ELIF", "ELSE", "ENDIF"}
+        branches = [(condition, self.parse_block(inner))]
+        else_block = []
+        while self.at_keyword("ELIF") or self.at_keyword("ELSE"):
+            _, header = self.lines[self.pos]
+            self.pos += 1
+            if header[0].upper() == "ELIF":
+                branches.append((self.condition_before(header, "THEN"), self.parse_block(inner)))
+            else:
+                else_block = self.parse_block(inner)
+        if not self.at_keyword("ENDIF"):
+            return ErrorNode(number, "E015")  # E015: Missing ENDIF
+        self.pos += 1
+        return IfNode(number, branches, else_block)
+
+    def parse_while(self, number, parts, stop):
+        self.pos += 1
+        condition = self.condition_before(parts, "DO")
+        if condition is None:
+            return ErrorNode(number, "E016")
+        block = self.parse_block(stop | {"ENDWHILE"})
+        if not self.at_keyword("ENDWHILE"):
+            return ErrorNode(number, "E017")
+        self.pos += 1
+        return WhileNode(number, condition, block)
+
+    def parse_for(self, number, parts, stop):
+        self.pos += 1
+        upper = [p.upper() for p in parts]
+        from_index = upper.index("FROM") if "FROM" in upper else -1
+        to_index = upper.index("TO") if "TO" in upper else -1
+        step_index = upper.index("STEP") if "STEP" in upper else -1
+        do_index = upper.index("DO") if "DO" in upper else -1
+        if (from_index == -1 or to_index == -1 or do_index == -1
+                or max(from_index, to_index, step_index) + 1 >= len(parts)):
+            return ErrorNode(number, "E018")
+        start_val = self.detect_type(parts[from_index + 1])
+        end_val = self.detect_type(parts[to_index + 1])
+        step_val = self.detect_type(parts[step_index + 1]) if step_index != -1 else 1
+        block = self.parse_block(stop | {"ENDFOR"})
+        if not self.at_keyword("ENDFOR"):
+            return ErrorNode(number, "E020")
+        self.pos += 1
+        return ForNode(number, parts[1], start_val, end_val, step_val, block)
+
+    def parse_parfor(self, number, parts, stop):
+        # PARFOR i FROM 1 TO 100 [STEP 1] [REDUCE ADD total MUL product ...] DO
+        self.pos += 1
+        block = self.parse_block(stop | {"ENDPARFOR"})
+        if not self.at_keyword("ENDPARFOR"):
+            return ErrorNode(number, "E022")
+        self.pos += 1
+        upper = [p.upper() for p in parts]
+        if len(parts) < 7 or upper[2] != "FROM" or upper[4] != "TO" or upper[-1] != "DO":
+            return ErrorNode(number, "E021")
+        bounds = [self.detect_type(parts[3]), self.detect_type(parts[5]), 1]
+        index = 6
+        if index < len(parts) - 1 and upper[index] == "STEP":
+            bounds[2] = self.detect_type(parts[index + 1])
+            index += 2
+        reductions = []
+        if index < len(parts) - 1 and upper[index] == "REDUCE":
+            clause = parts[index + 1:-1]
+            reductions = [(op.upper(), name) for op, name in zip(clause[::2], clause[1::2])]
+            index += 1 + len(clause)
+            names = [name for _, name in reductions]
+            if (len(clause) % 2 or not reductions or len(set(names)) != len(names) or parts[1] in names
+                    or any(op not in REDUCTION_COMMANDS for op, _ in reductions)):
+                return ErrorNode(number, "E021")
+        if index != len(parts) - 1 or any(type(val) is not int for val in bounds) or bounds[2] == 0:
+            return ErrorNode(number, "E021")
+        node = ParForNode(number, parts[1], *bounds, reductions, block)
+        error = ParForChecker().check(node)
+        if error is not None:
+            self.rejected.append(error)
+        return node
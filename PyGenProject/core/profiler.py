@@ -0,0 +1,152 @@
+import json
+from time import perf_counter
+
+from nodes import Statement, IfNode, WhileNode, ForNode, ParForNode, ErrorNode
+
+
+def restore(interpreter, hooks):
+    # Puts back the interpreter attributes a wrapper replaced: the wrapper of a profiler or budget
+    # attached before it, or nothing, so the method shows through again. Detach in reverse order.
+    for name, previous in hooks.items():
+        if previous is not None:
+            setattr(interpreter, name, previous)
+        elif name in vars(interpreter):
+            delattr(interpreter, name)
+
+
+class LineStats:
+    __slots__ = ("line", "kind", "count", "cumulative", "self_time", "iterations")
+
+    def __init__(self, line, kind):
+        self.line = line
+        self.kind = kind
+        self.count = 0
+        self.cumulative = 0.0
+        self.self_time = 0.0
+        self.iterations = None  # total loop iterations, for WHILE/FOR/PARFOR lines
+
+    def as_dict(self):
+        return {"line": self.line, "kind": self.kind, "count": self.count, "cumulative": self.cumulative,
+                "self": self.self_time, "iterations": self.iterations}
+
+
+class Profiler:
+    # Per-line profiler for PyGenInterpreter. attach() replaces the entries of the interpreter's
+    # dispatch table with timed wrappers and detach() puts the originals back, so an interpreter
+    # that is not being profiled runs exactly the code it runs without a profiler.
+    LOOPS = (WhileNode, ForNode, ParForNode)
+
+    def __init__(self):
+        self.stats = {}
+        self.stacks = {}  # "frame;frame;frame" -> self time, for collapsed-stack export
+        self.children = []  # time spent in nested nodes, one entry per active node
+        self.path = []
+        self.entries = {}  # id(block) -> times the interpreter entered that block
+        self.interpreter = None
+        self.original = None
+        self.hooks = None
+
+    def attach(self, interpreter):
+        self.interpreter = interpreter
+        self.original = dict(interpreter.dispatch)
+        self.hooks = {"execute_block": vars(interpreter).get("execute_block")}
+        for node_type, execute in self.original.items():
+            interpreter.dispatch[node_type] = self.wrap(execute)
+        execute_block = interpreter.execute_block
+        entries = self.entries
+
+        def counted_block(block):
+            key = id(block)
+            entries[key] = entries.get(key, 0) + 1
+            execute_block(block)
+
+        interpreter.execute_block = counted_block
+        interpreter.profiler = self
+        return self
+
+    def detach(self):
+        interpreter = self.interpreter
+        interpreter.dispatch.update(self.original)
+        restore(interpreter, self.hooks)
+        interpreter.profiler = None
+        self.interpreter = None
+
+    def label(self, node):
+        if isinstance(node, Statement):
+            return node.cmd
+        if isinstance(node, ErrorNode):
+            return node.code
+        return {IfNode: "IF", WhileNode: "WHILE", ForNode: "FOR", ParForNode: "PARFOR"}[type(node)]
+
+    def wrap(self, execute):
+        stats, stacks, children, path, entries = self.stats, self.stacks, self.children, self.path, self.entries
+        loops = self.LOOPS
+
+        def timed(node):
+            line_stats = stats.get(node.line)
+            if line_stats is None:
+                line_stats = stats[node.line] = LineStats(node.line, self.label(node))
+            is_loop = isinstance(node, loops)
+            if is_loop:
+                before = entries.get(id(node.block), 0)
+                if node.reduction is not None:
+                    node.reduction.count = 0
+            path.append(f"{line_stats.kind}:{node.line}")
+            children.append(0.0)
+            start = perf_counter()
+            try:
+                execute(node)
+            finally:
+                elapsed = perf_counter() - start
+                own = elapsed - children.pop()
+                if children:
+                    children[-1] += elapsed
+                key = ";".join(path)
+                stacks[key] = stacks.get(key, 0.0) + own
+                path.pop()
+                line_stats.count += 1
+                line_stats.cumulative += elapsed
+                line_stats.self_time += own
+                if is_loop:
+                    line_stats.iterations = (line_stats.iterations or 0) + self.iterations(node, before)
+
+        return timed
+
+    def iterations(self, node, before):
+        # Loops that ran their body through execute_block are counted directly; the range-based
+        # FOR paths, closed-form reductions and parallel PARFOR loops are counted from their range
+        entered = self.entries.get(id(node.block), 0) - before
+        if entered:
+            return entered
+        if node.reduction is not None and node.reduction.count:
+            return node.reduction.count
+        if isinstance(node, ForNode) and (node.counted or isinstance(node, ParForNode)):
+            return len(range(node.start, node.end + 1 if node.step > 0 else node.end - 1, node.step))
+        return 0
+
+    def sorted_stats(self, key="self"):
+        attribute = {"self": "self_time", "cumulative": "cumulative", "count": "count", "line": "line"}[key]
+        return sorted(self.stats.values(), key=lambda stats: getattr(stats, attribute), reverse=key != "line")
+
+    def report(self, key="self", limit=None):
+        rows = self.sorted_stats(key)[:limit]
+        total = sum(stats.self_time for stats in self.stats.values())
+        lines = [f"{'line':>6} {'kind':<8} {'count':>10} {'cumulative':>12} {'self':>12} {'self%':>6} {'iterations':>11}"]
+        for stats in rows:
+            share = 100 * stats.self_time / total if total else 0.0
+            iterations = "" if stats.iterations is None else stats.iterations
+            lines.append(f"{stats.line:>6} {stats.kind:<8} {stats.count:>10} {stats.cumulative:>11.6f}s "
+                         f"{stats.self_time:>11.6f}s {share:>5.1f}% {iterations:>11}")
+        return "\n".join(lines)
+
+    def hot_loops(self, limit=5):
+        loops = [stats for stats in self.stats.values() if stats.iterations is not None]
+        return sorted(loops, key=lambda stats: stats.cumulative, reverse=True)[:limit]
+
+    def to_json(self):
+        return json.dumps({"lines": [stats.as_dict() for stats in self.sorted_stats("line")],
+                           "hot_loops": [stats.line for stats in self.hot_loops()]}, indent=2)
+
+    def collapsed(self):
+        # One "frame;frame count" line per stack, with self time in microseconds, for flamegraph.pl
+        return "\n".join(f"{stack} {round(seconds * 1e6)}" for stack, seconds in sorted(self.stacks.items()))
@@ -0,0 +1,69 @@
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from PyGenProject.utils.error_codes import GetError
+from PyGenProject.utils.output import StdoutSink
+from PyGenProject.utils.inputs import InputSource, IterableInput, MappingInput
+from frame import UNSET
+from vm import VirtualMachine, ExecutionContext
+
+
+class CompiledProgram:
+    # A program parsed, optimized, compiled and linked once. It holds only read-only data: the linked
+    # code, the constants and the variable layout, so one instance can be shared by any number of
+    # threads. Every run() gets a fresh ExecutionContext with its own variables, input and output.
+    __slots__ = ("code", "consts", "names", "slots", "initial", "vm")
+
+    def __init__(self, source, optimize=True):
+        vm = VirtualMachine(optimize=optimize)
+        code_object = vm.compile(source)
+        frame = vm.command.frame
+        fields = {
+            "code": tuple(vm.link(code_object)),
+            "consts": tuple(code_object.consts),
+            "names": tuple(frame.names),
+            "slots": MappingProxyType(dict(frame.slots)),
+            "initial": (UNSET,) * len(frame.names),
+            "vm": vm,  # only its execute() loop and detect_type are used
+        }
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledProgram is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CompiledProgram is immutable")
+
+    def context(self, bindings=None, inputs=None, output=None, color=True):
+        values = list(self.initial)
+        if bindings:
+            slots = self.slots
+            for name, value in bindings.items():
+                slot = slots.get(name)
+                if slot is not None:  # the program never reads a name it does not mention
+                    values[slot] = value
+        output = output or StdoutSink()
+        return ExecutionContext(values, self.names, output, self.input_source(inputs), GetError(output, color))
+
+    def input_source(self, inputs):
+        # An InputSource, a mapping of pre-bound INPUT values, or an iterable of values read in order;
+        # without inputs, INPUT reports E005
+        if isinstance(inputs, InputSource):
+            return inputs
+        if isinstance(inputs, Mapping):
+            return MappingInput(inputs)
+        return IterableInput(() if inputs is None else inputs)
+
+    def run(self, bindings=None, inputs=None, output=None, color=True):
+        # Returns the run's context, whose `variables` are the values the program ended with
+        context = self.context(bindings, inputs, output, color)
+        try:
+            self.vm.execute(self.code, self.consts, context)
+        finally:
+            context.output.flush()
+        return context
+
+
+def compile(source, optimize=True):
+    return CompiledProgram(source, optimize)
@@ -0,0 +1,258 @@
+import math
+import operator
+from functools import reduce
+from itertools import repeat
+
+from nodes import Statement
+from frame import UNSET
+from conditions import ConditionCompiler
+
+OPERATIONS = {"ADD": operator.add, "SUB": operator.sub, "MUL": operator.mul}
+# Integers up to 2**53 convert to float64 exactly, so NumPy sees the same operands as Python
+EXACT_FLOAT_INT = 2 ** 53
+NUMPY_MIN_COUNT = 4096
+NUMPY_CHUNK = 65536
+NOT_LOADED = object()
+numpy = NOT_LOADED  # set by load_numpy(): importing NumPy takes longer than starting the interpreter
+
+
+def load_numpy():
+    # The numpy module, or None when it is not installed; imported the first time a loop needs it
+    global numpy
+    if numpy is NOT_LOADED:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        numpy = module
+    return numpy
+
+
+def is_number(value):
+    return type(value) is int or type(value) is float
+
+
+def check(accumulators, values):
+    # Every accumulator and every loop-invariant operand must already be an int or a float
+    for acc in accumulators:
+        if not is_number(values[acc.target]):
+            return False
+        if not acc.counter and not is_number(acc.operand(values)):
+            return False
+    return True
+
+
+def within(limits, count, accumulators, values):
+    # `limits` is (iterations, slow iterations) a Budget allows. Integer ADD/SUB closed forms take
+    # the same time for any count; products and float folds grow with it, so they get the second.
+    if limits is None:
+        return True
+    allowed, slow = limits
+    if count > allowed:
+        return False
+    return count <= slow or all(acc.cmd != "MUL" and type(values[acc.target]) is int
+                                and (acc.counter or type(acc.operand(values)) is int) for acc in accumulators)
+
+
+def accumulate(cmd, current, series, value, count):
+    # Result of applying `current (cmd)= operand` count times, where the operand takes the values of
+    # the range `series`, or is `value` on every iteration when series is None
+    if type(current) is int and (series is not None or type(value) is int):
+        # Integer arithmetic is exact, so the closed forms give the sequential result
+        if cmd == "MUL":
+            if current == 0:
+                return 0
+            return current * (math.prod(series) if series is not None else value ** count)
+        if series is not None:
+            total = len(series) * (series[0] + series[-1]) // 2 if series else 0
+        else:
+            total = count * value
+        return current + total if cmd == "ADD" else current - total
+    if count >= NUMPY_MIN_COUNT and exact_in_float64(current, series, value) and load_numpy() is not None:
+        return accumulate_numpy(cmd, current, series, value, count)
+    # Floats round after every step, so they are folded one operation at a time, in order
+    operands = series if series is not None else repeat(value, count)
+    return reduce(OPERATIONS[cmd], operands, current)
+
+
+def exact_in_float64(current, series, value):
+    bounds = (series[0], series[-1]) if series is not None else (value,)
+    return all(type(item) is float or -EXACT_FLOAT_INT <= item <= EXACT_FLOAT_INT for item in (current,) + bounds)
+
+
+def accumulate_numpy(cmd, current, series, value, count):
+    # ufunc.accumulate folds strictly left to right, unlike ufunc.reduce, which sums pairwise
+    ufunc = {"ADD": numpy.add, "SUB": numpy.subtract, "MUL": numpy.multiply}[cmd]
+    result = float(current)
+    with numpy.errstate(all="ignore"):
+        for begin in range(0, count, NUMPY_CHUNK):
+            size = min(NUMPY_CHUNK, count - begin)
+            buffer = numpy.empty(size + 1, dtype=numpy.float64)
+            buffer[0] = result
+            if series is not None:
+                part = series[begin:begin + size]
+                buffer[1:] = numpy.arange(part.start, part.stop, part.step, dtype=numpy.int64)
+            else:
+                buffer[1:] = value
+            result = float(ufunc.accumulate(buffer)[-1])
+    return result
+
+
+class Accumulator:
+    # One `ADD/SUB/MUL target operand` statement of a reducible loop body
+    def __init__(self, cmd, target, source, literal, counter, after):
+        self.cmd = cmd
+        self.target = target
+        self.source = source
+        self.literal = literal
+        self.counter = counter  # the operand is the loop variable
+        self.after = after  # the statement follows the WHILE counter update
+
+    def operand(self, values):
+        value = values[self.source]
+        return self.literal if value is UNSET else value
+
+
+class ForReduction:
+    def __init__(self, slot, start, end, step, accumulators):
+        self.slot = slot
+        self.series = range(start, end + 1 if step > 0 else end - 1, step)
+        self.accumulators = accumulators
+        self.count = 0  # iterations replaced by the last successful run, for the profiler
+        self.limits = None  # set by a Budget before every run, see within()
+
+    def run(self, values):
+        # Returns False, leaving every value untouched, when the loop has to run normally
+        series = self.series
+        if not check(self.accumulators, values) or not within(self.limits, len(series), self.accumulators, values):
+            return False
+        for acc in self.accumulators:
+            operand = None if acc.counter else acc.operand(values)
+            values[acc.target] = accumulate(acc.cmd, values[acc.target], series if acc.counter else None,
+                                            operand, len(series))
+        values[self.slot] = series[-1] + series.step if series else series.start
+        self.count = len(series)
+        return True
+
+
+class WhileReduction:
+    # WHILE counter op bound, with one `ADD/SUB counter step` in the body and accumulators around it
+    FLIPPED = {"<": ">", ">": "<", "<=": ">=", ">=": "<=", "==": "==", "!=": "!="}
+
+    def __init__(self, counter, compare, bound, update, accumulators):
+        self.counter = counter
+        self.compare = compare
+        self.bound = bound  # (slot, literal)
+        self.update = update  # Accumulator for the counter
+        self.accumulators = accumulators
+        self.count = 0
+        self.limits = None
+
+    def run(self, values):
+        start = values[self.counter]
+        bound_slot, literal = self.bound
+        bound = values[bound_slot]
+        if bound is UNSET:
+            bound = literal
+        step = self.update.operand(values)
+        if type(start) is not int or type(bound) is not int or type(step) is not int or step == 0:
+            return False
+        if self.update.cmd == "SUB":
+            step = -step
+        count = self.iterations(start, bound, step)
+        if not count or not check(self.accumulators, values) or not within(self.limits, count, self.accumulators, values):
+            return False
+        before = range(start, start + count * step, step)
+        after = range(start + step, start + (count + 1) * step, step)
+        for acc in self.accumulators:
+            series = (after if acc.after else before) if acc.counter else None
+            operand = None if acc.counter else acc.operand(values)
+            values[acc.target] = accumulate(acc.cmd, values[acc.target], series, operand, count)
+        values[self.counter] = start + count * step
+        self.count = count
+        return True
+
+    def iterations(self, start, bound, step):
+        # Number of iterations, or None when the loop would never stop
+        compare = self.compare
+        if not ConditionCompiler.COMPARISONS[compare](start, bound):
+            return 0
+        if compare == "<" and step > 0:
+            return (bound - start + step - 1) // step
+        if compare == "<=" and step > 0:
+            return (bound - start) // step + 1
+        if compare == ">" and step < 0:
+            return (start - bound - step - 1) // -step
+        if compare == ">=" and step < 0:
+            return (start - bound) // -step + 1
+        if compare == "==":
+            return 1
+        if compare == "!=" and (bound - start) % step == 0 and (bound - start) // step > 0:
+            return (bound - start) // step
+        return None
+
+
+class LoopReducer:
+    # Recognizes loops whose body only accumulates into variables with ADD/SUB/MUL, using the loop
+    # variable or a loop-invariant operand, so that they can run as a closed form instead of a loop
+    def __init__(self, commands, tokenizer=None):
+        self.commands = commands
+        self.tokenizer = tokenizer or commands.tokenizer
+
+    def statements(self, block):
+        if not block:
+            return None
+        for node in block:
+            if type(node) is not Statement or node.op != "arithmetic" or node.args[0] not in OPERATIONS:
+                return None
+        return [node.args for node in block]
+
+    def accumulators(self, statements, counter, after=None):
+        targets = [target for _, target, _, _ in statements]
+        if len(set(targets)) != len(targets) or counter in targets:
+            return None
+        accumulators = []
+        for position, (cmd, target, source, literal) in enumerate(statements):
+            if source in targets:
+                return None
+            accumulators.append(Accumulator(cmd, target, source, literal, source == counter,
+                                            after is not None and position > after))
+        return accumulators
+
+    def analyze_for(self, node):
+        statements = self.statements(node.block)
+        if not node.counted or statements is None:
+            return None
+        accumulators = self.accumulators(statements, node.slot)
+        if accumulators is None:
+            return None
+        return ForReduction(node.slot, node.start, node.end, node.step, accumulators)
+
+    def analyze_while(self, node):
+        statements = self.statements(node.block)
+        if statements is None or node.condition is None:
+            return None
+        parts = self.tokenizer.tokenize(node.condition)
+        if len(parts) != 3 or parts[1] not in ConditionCompiler.COMPARISONS:
+            return None
+        left, compare, right = parts
+        slot, detect_type = self.commands.frame.slot, self.commands.detect_type
+        assigned = {target for _, target, _, _ in statements}
+        if slot(left) in assigned and slot(right) not in assigned:
+            counter, bound = slot(left), (slot(right), detect_type(right))
+        elif slot(right) in assigned and slot(left) not in assigned:
+            counter, bound = slot(right), (slot(left), detect_type(left))
+            compare = WhileReduction.FLIPPED[compare]
+        else:
+            return None
+        updates = [position for position, (cmd, target, _, _) in enumerate(statements) if target == counter]
+        position = updates[0]
+        cmd, _, source, literal = statements[position]
+        if cmd == "MUL" or source in assigned:
+            return None
+        rest = statements[:position] + statements[position + 1:]
+        accumulators = self.accumulators(rest, counter, position - 1)
+        if accumulators is None:
+            return None
+        update = Accumulator(cmd, counter, source, literal, False, False)
+        return WhileReduction(counter, compare, bound, update, accumulators)
@@ -0,0 +1,64 @@
+from nodes import Statement, IfNode, WhileNode, ForNode
+from reductions import LoopReducer
+from typecheck import TypeChecker
+
+
+class Resolver:
+    # Binds every identifier in a parsed program to a fixed slot of the Commands frame
+    def __init__(self, commands):
+        self.commands = commands
+        self.reducer = LoopReducer(commands)
+        self.checker = TypeChecker(commands)
+        self.diagnostics = []  # (line, code, kwargs) found by the type checker in the last program
+
+    def resolve(self, block, specialize=True):
+        # `specialize` runs the type checker, which assumes the block runs once, starting from the
+        # current variable values
+        self.bind(block)
+        self.diagnostics = self.checker.check(block) if specialize else []
+        return block
+
+    def bind(self, block):
+        for node in block:
+            if isinstance(node, Statement):
+                node.op, node.args = self.commands.resolve(node.cmd, node.parts)
+            elif isinstance(node, IfNode):
+                node.evaluators = [self.compile_condition(condition) for condition, _ in node.branches]
+                for _, branch in node.branches:
+                    self.bind(branch)
+                self.bind(node.else_block)
+            elif isinstance(node, WhileNode):
+                node.evaluate = self.compile_condition(node.condition)
+                self.bind(node.block)
+                node.reduction = self.reducer.analyze_while(node)
+            elif isinstance(node, ForNode):
+                node.slot = self.commands.frame.slot(node.var)
+                self.bind(node.block)
+                node.counted = (all(type(val) is int for val in (node.start, node.end, node.step))
+                                and node.step != 0 and node.slot not in self.assigned(node.block))
+                node.reduction = self.reducer.analyze_for(node)
+        return block
+
+    def assigned(self, block):
+        # Slots written anywhere in a resolved block, including nested blocks
+        slots = set()
+        for node in block:
+            if isinstance(node, Statement):
+                position = self.commands.TARGETS.get(node.op)
+                if position is not None:
+                    slots.add(node.args[position])
+            elif isinstance(node, IfNode):
+                for _, branch in node.branches:
+                    slots |= self.assigned(branch)
+                slots |= self.assigned(node.else_block)
+            elif isinstance(node, WhileNode):
+                slots |= self.assigned(node.block)
+            elif isinstance(node, ForNode):
+                slots.add(node.slot)
+                slots |= self.assigned(node.block)
+        return slots
+
+    def compile_condition(self, condition):
+        if condition is None:
+            return None
+        return self.commands.conditions.compile(condition)
@@ -0,0 +1,62 @@
+from collections import deque
+
+from PyGenProject.utils.output import ForwardingSink, StdoutSink
+from async_interpreter import AsyncPyGenInterpreter
+
+
+class SteppedProgram:
+    # A program that runs in slices: every step() executes about `slice_size` statements and returns.
+    # It is built on AsyncPyGenInterpreter, whose coroutine is resumed here by hand instead of by an
+    # event loop, so the input source has to answer synchronously.
+    def __init__(self, source, output=None, color=True, input_source=None, budget=None, slice_size=1000):
+        self.output = output or StdoutSink()
+        self.interpreter = AsyncPyGenInterpreter(ForwardingSink(self.output), color, input_source,
+                                                 yield_every=slice_size)
+        if budget is not None:
+            budget.attach(self.interpreter)
+        self.coroutine = self.interpreter.run(source)
+        self.done = False
+
+    def step(self):
+        # Runs one slice; returns True once the program has finished
+        if self.done:
+            return True
+        try:
+            waiting = self.coroutine.send(None)
+        except StopIteration:
+            self.finish()
+            return True
+        if waiting is not None:
+            self.close()
+            raise RuntimeError("SteppedProgram needs an input source that does not await")
+        return False
+
+    def close(self):
+        if not self.done:
+            self.coroutine.close()
+            self.finish()
+
+    def finish(self):
+        self.done = True
+        self.output.flush()
+
+
+class RoundRobin:
+    # Runs many SteppedPrograms in turn, one slice each, until all of them have finished
+    def __init__(self, programs=()):
+        self.queue = deque(programs)
+
+    def add(self, program):
+        self.queue.append(program)
+
+    def step(self):
+        # Gives every running program one slice; returns how many are still running
+        for _ in range(len(self.queue)):
+            program = self.queue.popleft()
+            if not program.step():
+                self.queue.append(program)
+        return len(self.queue)
+
+    def run(self):
+        while self.step():
+            pass
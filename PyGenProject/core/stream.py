@@ -0,0 +1,85 @@
+import mmap
+import re
+
+OPENERS = ("IF", "WHILE", "FOR", "PARFOR")
+FIRST_WORD = re.compile(r'\s*([^\s"<>=!]+)')
+
+
+class SourceReader:
+    # The lines of a program file, read through a read-only memory map, or in chunks when the file
+    # cannot be mapped (empty files, pipes). Mapped pages that have been read are handed back to
+    # the OS with release(), so the file never has to be resident as a whole.
+    def __init__(self, path, chunk_size=1 << 20, encoding="utf-8"):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.map = None
+        self.released = 0
+
+    def lines(self):
+        with open(self.path, "rb", buffering=self.chunk_size) as file:
+            try:
+                self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                self.map = None
+            if self.map is None:
+                for line in file:
+                    yield line.decode(self.encoding).rstrip("\r\n")
+                return
+            with self.map:
+                if hasattr(self.map, "madvise"):
+                    self.map.madvise(mmap.MADV_SEQUENTIAL)
+                for line in iter(self.map.readline, b""):
+                    yield line.decode(self.encoding).rstrip("\r\n")
+            self.map = None
+
+    def release(self):
+        # Drops the pages before the current read position from memory; they stay in the file
+        if self.map is None or not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        end = self.map.tell() // mmap.PAGESIZE * mmap.PAGESIZE
+        if end > self.released:
+            self.map.madvise(mmap.MADV_DONTNEED, self.released, end - self.released)
+            self.released = end
+
+
+class SourceStream:
+    # Splits a program into pieces that each end at the top level, without reading it as a whole:
+    # straight-line statements are grouped up to `batch_lines` lines, and a control-flow block is
+    # kept whole, so only the block that is currently open is buffered. Yields (first_line, source).
+    # The blocks are tracked the way Parser.parse_block nests them, so parsing the pieces one by one
+    # gives the same statements as parsing the whole file.
+    def __init__(self, reader, parser, batch_lines=1000):
+        self.reader = reader
+        self.parser = parser
+        self.batch_lines = batch_lines
+
+    def __iter__(self):
+        lines = []
+        first_line = 1
+        open_blocks = []  # closing keywords of the blocks that are open, innermost last
+        for number, line in enumerate(self.reader.lines(), 1):
+            lines.append(line)
+            match = FIRST_WORD.match(line.split("//", 1)[0])
+            if match is not None:
+                word = match.group(1).upper()
+                if word in OPENERS:
+                    closer = self.parser.block_closer(self.parser.tokenizer.tokenize(line))
+                    if closer is not None:
+                        open_blocks.append(closer)
+                elif word in ("ELIF", "ELSE") and "ENDIF" in open_blocks:
+                    self.close(open_blocks, "ENDIF", False)
+                elif word in open_blocks:
+                    self.close(open_blocks, word, True)
+            if not open_blocks and len(lines) >= self.batch_lines:
+                yield first_line, "\n".join(lines)
+                self.reader.release()
+                lines = []
+                first_line = number + 1
+        if lines:
+            yield first_line, "\n".join(lines)
+
+    def close(self, open_blocks, closer, inclusive):
+        # A closing keyword also ends the blocks opened inside its own, as it is in their stop set
+        position = len(open_blocks) - 1 - open_blocks[::-1].index(closer)
+        del open_blocks[position if inclusive else position + 1:]
@@ -0,0 +1,259 @@
+import operator
+
+from nodes import Statement, IfNode, WhileNode, ForNode
+from frame import UNSET
+from arrays import Array
+
+NUMBERS = frozenset((int, float, bool))
+NUMERIC = NUMBERS | {Array}  # operands of arithmetic, which works element-wise on arrays
+ANY = frozenset((int, float, bool, str))
+COMPARABLE = (int, float, bool, str)
+FUNCTIONS = {"ADD": operator.add, "SUB": operator.sub, "MUL": operator.mul, "MOD": operator.mod,
+             "DIV": operator.truediv, "AND": operator.and_, "OR": operator.or_, "XOR": operator.xor}
+
+
+def number_type(cmd, left, right):
+    if cmd == "DIV" or float in (left, right):
+        return float
+    return int
+
+
+class TypeChecker:
+    # Flow analysis over a resolved program. For every slot it tracks the set of types the variable
+    # may hold, with UNSET standing for "may not be assigned yet"; loops are iterated until their
+    # entry state stops changing. Statements that fail whatever the variables hold are reported with
+    # their line (E002/E003/E008/E009), and statements whose operands are proven numeric or boolean
+    # are rebound to the specialized Commands operations, which skip the runtime checks.
+    def __init__(self, commands):
+        self.commands = commands
+        self.frame = commands.frame
+        self.diagnostics = []
+        self.line = 0
+
+    def check(self, block):
+        # Starts from the values the frame holds right now, so bound variables are known
+        self.diagnostics = []
+        state = [frozenset((UNSET if value is UNSET else type(value),)) for value in self.frame.values]
+        self.visit(block, state, True)
+        return self.diagnostics
+
+    def report(self, code, **kwargs):
+        self.diagnostics.append((self.line, code, kwargs))
+
+    def join(self, first, second):
+        return [a | b for a, b in zip(first, second)]
+
+    def operand(self, state, slot, literal):
+        # Types of "variable, or the literal when the variable is unset"
+        types = state[slot]
+        if UNSET in types:
+            return (types - {UNSET}) | {type(literal)}
+        return types
+
+    def constant(self, state, slot, literal):
+        # ("slot", slot) or ("const", literal) when the operand is certainly set or certainly unset
+        if UNSET not in state[slot]:
+            return "slot", slot
+        if state[slot] == {UNSET}:
+            return "const", literal
+        return None
+
+    def visit(self, block, state, emit):
+        for node in block:
+            self.line = node.line
+            if isinstance(node, Statement):
+                self.visit_statement(node, state, emit)
+            elif isinstance(node, IfNode):
+                state[:] = self.visit_if(node, state, emit)
+            elif isinstance(node, WhileNode):
+                state[:] = self.visit_while(node, state, emit)
+            elif isinstance(node, ForNode):
+                state[:] = self.visit_for(node, state, emit)
+        return state
+
+    def visit_if(self, node, state, emit):
+        if emit:
+            node.evaluators = [self.typed_condition(condition, state) for condition, _ in node.branches]
+        result = list(state)
+        for _, branch in node.branches:
+            result = self.join(result, self.visit(branch, list(state), emit))
+        if node.else_block:
+            result = self.join(result, self.visit(node.else_block, list(state), emit))
+        return result
+
+    def visit_while(self, node, state, emit):
+        head = self.loop(state, lambda current, emitting: self.visit(node.block, current, emitting), emit)
+        if emit:
+            self.line = node.line
+            node.evaluate = self.typed_condition(node.condition, head)
+        return head
+
+    def visit_for(self, node, state, emit):
+        if not all(isinstance(val, (int, float)) for val in (node.start, node.end, node.step)):
+            return state
+        slot, step_type = node.slot, type(node.step)
+
+        def body(current, emitting):
+            self.visit(node.block, current, emitting)
+            current[slot] = frozenset(number_type("ADD", var_type, step_type) for var_type in current[slot] & NUMBERS)
+            return current
+
+        entry = list(state)
+        entry[slot] = frozenset((type(node.start),))
+        return self.loop(entry, body, emit)
+
+    def loop(self, entry, body, emit):
+        # The state at the loop test: the entry state joined with the state after any number of passes
+        head = entry
+        while True:
+            following = self.join(entry, body(list(head), False))
+            if following == head:
+                break
+            head = following
+        if emit:
+            body(list(head), True)
+        return head
+
+    def typed_condition(self, condition, state):
+        if condition is None:
+            return None
+        line = self.line
+
+        def typing(left_slot, left_value, right_slot, right_value):
+            left = self.operand(state, left_slot, left_value)
+            right = self.operand(state, right_slot, right_value)
+            pairs = [(a, b) for a in left for b in right]
+            valid = [a in COMPARABLE and issubclass(b, a) for a, b in pairs]
+            if not any(valid):
+                self.diagnostics.append((line, "E009", {}))
+                return None
+            if not all(valid):
+                return None
+            left_operand = self.constant(state, left_slot, left_value)
+            right_operand = self.constant(state, right_slot, right_value)
+            if left_operand is None or right_operand is None:
+                return None
+            return left_operand, right_operand
+
+        return self.commands.conditions.compile(condition, typing)
+
+    def visit_statement(self, node, state, emit):
+        handler = getattr(self, "visit_" + node.op, None)
+        if handler is not None:
+            handler(node, state, emit, *node.args)
+
+    def visit_set_value(self, node, state, emit, target, source, literal):
+        state[target] = self.operand(state, source, literal)
+
+    def visit_input_value(self, node, state, emit, target):
+        # E005 leaves the variable as it was
+        state[target] = state[target] | ANY
+
+    def visit_arithmetic(self, node, state, emit, cmd, target, source, literal):
+        current = state[target]
+        value = self.operand(state, source, literal)
+        if emit:
+            names = self.frame.names
+            if not current & NUMERIC:
+                self.report("E003", var=names[target])
+            elif not value & NUMERIC:
+                self.report("E002", cmd=cmd, val=literal if state[source] == {UNSET} else names[source])
+            elif current <= NUMBERS and value <= NUMBERS:
+                self.specialize_update(node, state, cmd, target, source, literal)
+        result = frozenset(number_type(cmd, a, b) for a in current & NUMBERS for b in value & NUMBERS)
+        if (Array in current and value & NUMERIC) or (Array in value and current & NUMBERS):
+            result |= {Array}
+        if not (current <= NUMBERS and value <= NUMBERS) or cmd == "DIV":
+            result |= current  # an error, or a division by zero, leaves the target unchanged
+        state[target] = result
+
+    def specialize_update(self, node, state, cmd, target, source, literal):
+        operand = self.constant(state, source, literal)
+        if operand is None:
+            return
+        kind, value = operand
+        if kind == "slot":
+            if cmd != "DIV":  # the divisor may be zero
+                node.op, node.args = "update", (FUNCTIONS[cmd], target, value)
+        elif cmd != "DIV" or value != 0:
+            node.op, node.args = "update_const", (FUNCTIONS[cmd], target, value)
+
+    def visit_clc(self, node, state, emit, target, left, op, right):
+        a, b = state[left], state[right]
+        safe = UNSET not in a and UNSET not in b and a <= NUMBERS and b <= NUMBERS
+        if emit:
+            names = self.frame.names
+            if a == {UNSET}:
+                self.report("E008", var=names[left])
+            elif b == {UNSET}:
+                self.report("E008", var=names[right])
+            elif not a & NUMERIC or not b & NUMERIC:
+                self.report("E009")
+            elif safe and op in ("ADD", "SUB", "MUL", "MOD"):
+                node.op, node.args = "clc_number", (FUNCTIONS[op], target, left, right)
+        if op not in FUNCTIONS or op in ("AND", "OR", "XOR"):
+            return
+        result = frozenset(number_type(op, x, y) for x in a & NUMBERS for y in b & NUMBERS)
+        if Array in a or Array in b:
+            result |= {Array}
+        if not safe or op == "DIV":
+            result |= state[target]
+        state[target] = result
+
+    def visit_logical(self, node, state, emit, cmd, target, source, literal):
+        current = state[target]
+        value = state[source] - {UNSET}
+        literal_ok = isinstance(literal, bool)
+        if UNSET in state[source] and literal_ok:
+            value = value | {bool}
+        if emit:
+            if bool not in current:
+                self.report("E003", var=self.frame.names[target])
+            elif state[source] == {UNSET} and not literal_ok:
+                self.report("E002", cmd=cmd, val=literal)
+            elif current == {bool} and value == {bool}:
+                operand = self.constant(state, source, literal)
+                if operand is not None:
+                    kind, operand_value = operand
+                    node.op = "update" if kind == "slot" else "update_const"
+                    node.args = (FUNCTIONS[cmd], target, operand_value)
+        result = value | {bool}
+        if current != {bool} or (UNSET in state[source] and not literal_ok):
+            result |= current
+        state[target] = result
+
+    def visit_logical_not(self, node, state, emit, target):
+        current = state[target]
+        if emit:
+            if bool not in current:
+                self.report("E003", var=self.frame.names[target])
+            elif current == {bool}:
+                node.op, node.args = "not_bool", (target,)
+        state[target] = current | {bool} if current != {bool} else current
+
+    # Arrays: the results are kept loose, since sizes, indexes and element types are not tracked
+
+    def require_array(self, state, emit, source):
+        if emit and Array not in state[source]:
+            self.report("E028", var=self.frame.names[source])
+
+    def visit_array_new(self, node, state, emit, target, size_slot, size, init_slot, init):
+        if emit and (int not in self.operand(state, size_slot, size)
+                     or not self.operand(state, init_slot, init) & NUMBERS):
+            self.report("E026")
+        state[target] = state[target] | {Array}
+
+    def visit_array_get(self, node, state, emit, target, source, index_slot, index):
+        self.require_array(state, emit, source)
+        state[target] = state[target] | {int, float}
+
+    def visit_array_put(self, node, state, emit, target, index_slot, index, value_slot, value):
+        self.require_array(state, emit, target)
+
+    def visit_array_len(self, node, state, emit, target, source):
+        self.require_array(state, emit, source)
+        state[target] = frozenset((int,)) if state[source] == {Array} else state[target] | {int}
+
+    def visit_array_reduce(self, node, state, emit, cmd, target, source):
+        self.require_array(state, emit, source)
+        state[target] = state[target] | {int, float}
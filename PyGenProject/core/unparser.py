@@ -0,0 +1,43 @@
+from nodes import Statement, IfNode, WhileNode, ForNode, ParForNode, ErrorNode
+
+
+class Unparser:
+    # Writes a parsed program back as PyGen source, one statement per line, for --dump-optimized
+    INDENT = "    "
+
+    def unparse(self, block):
+        lines = []
+        self.write_block(block, 0, lines)
+        return "\n".join(lines)
+
+    def write_block(self, block, depth, lines):
+        indent = self.INDENT * depth
+        for node in block:
+            if isinstance(node, Statement):
+                lines.append(indent + " ".join(node.parts))
+            elif isinstance(node, IfNode):
+                for index, (condition, branch) in enumerate(node.branches):
+                    keyword = "IF" if index == 0 else "ELIF"
+                    lines.append(f"{indent}{keyword} {condition} THEN" if condition is not None else f"{indent}{keyword}")
+                    self.write_block(branch, depth + 1, lines)
+                if node.else_block:
+                    lines.append(indent + "ELSE")
+                    self.write_block(node.else_block, depth + 1, lines)
+                lines.append(indent + "ENDIF")
+            elif isinstance(node, WhileNode):
+                lines.append(f"{indent}WHILE {node.condition} DO")
+                self.write_block(node.block, depth + 1, lines)
+                lines.append(indent + "ENDWHILE")
+            elif isinstance(node, ParForNode):
+                header = f"{indent}PARFOR {node.var} FROM {node.start} TO {node.end} STEP {node.step}"
+                if node.reductions:
+                    header += " REDUCE " + " ".join(f"{op} {name}" for op, name in node.reductions)
+                lines.append(header + " DO")
+                self.write_block(node.block, depth + 1, lines)
+                lines.append(indent + "ENDPARFOR")
+            elif isinstance(node, ForNode):
+                lines.append(f"{indent}FOR {node.var} FROM {node.start} TO {node.end} STEP {node.step} DO")
+                self.write_block(node.block, depth + 1, lines)
+                lines.append(indent + "ENDFOR")
+            elif isinstance(node, ErrorNode):
+                lines.append(f"{indent}// line {node.line}: {node.code}")
@@ -0,0 +1,353 @@
+import operator
+import sys
+from array import array
+
+from PyGenProject.utils.error_codes import GetError, ProgramStopped
+from PyGenProject.utils.output import StdoutSink
+from PyGenProject.utils.inputs import InputExhausted
+from tokenizer import Tokenizer
+from commands import Commands
+from parser import Parser
+from compiler import Compiler
+from optimizer import Optimizer
+from frame import UNSET
+from arrays import Array
+import arrays
+from opcodes import (
+    LOAD_VALUE, LOAD_CONST, STORE, INPUT, ARITH, CLC, PRINT, LOGIC, NOT, COMPARE,
+    JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP, JUMP, JUMP_IF_FALSE, FOR_INIT, FOR_ITER, FOR_STEP, ERROR,
+    ARRAY_NEW, GET_ITEM, PUT_ITEM, ARRAY_LEN, ARRAY_REDUCE,
+    ARITH_KINDS, LOGIC_KINDS, REDUCE_KINDS, ARITY, NAME_OPERANDS,
+)
+
+
+class ExecutionContext:
+    # The state of one run of a linked program: the variable values and the run's input and output.
+    # The code itself is never written, so one linked program can run in many contexts at once.
+    __slots__ = ("values", "names", "output", "input_source", "error_handler", "lines")
+
+    def __init__(self, values, names, output, input_source, error_handler, lines=None):
+        self.values = values
+        self.names = names
+        self.output = output
+        self.input_source = input_source
+        self.error_handler = error_handler
+        self.lines = lines  # source line of every code unit, for current_line()
+
+    @property
+    def variables(self):
+        values = self.values
+        return {name: values[slot] for slot, name in enumerate(self.names) if values[slot] is not UNSET}
+
+
+class VirtualMachine:
+    COMPARISONS = {
+        "==": operator.eq, "!=": operator.ne,
+        "<": operator.lt, ">": operator.gt,
+        "<=": operator.le, ">=": operator.ge,
+    }
+
+    def __init__(self, output=None, color=True, input_source=None, error_handler=None, optimize=True):
+        self.output = output or StdoutSink()
+        self.error_handler = error_handler or GetError(self.output, color)
+        self.tokenizer = Tokenizer()
+        self.command = Commands(self.output, self.error_handler, input_source)
+        self.parser = Parser(self.tokenizer, self.command.detect_type)
+        self.compiler = Compiler(self.tokenizer, self.command.detect_type)
+        self.optimizer = Optimizer(self.command.detect_type, self.tokenizer) if optimize else None
+
+    def compile(self, lines):
+        tree = self.parser.parse(lines)
+        if self.optimizer is not None:
+            tree = self.optimizer.optimize(tree)
+        return self.compiler.compile(tree)
+
+    def compile_program(self, lines):
+        return self.compile(lines)
+
+    def run_compiled(self, code_object):
+        try:
+            self.run(code_object)
+        except ProgramStopped:
+            pass
+        finally:
+            self.output.flush()
+
+    def run_program(self, lines):
+        self.run_compiled(self.compile_program(lines))
+
+    def link(self, code_object):
+        # Rewrites name-pool operands into slots of this VM's frame, once per run
+        slot = self.command.frame.slot
+        slots = [slot(name) for name in code_object.names]
+        code = array("i", code_object.code)
+        pc = 0
+        while pc < len(code):
+            op = code[pc]
+            for idx in NAME_OPERANDS.get(op, ()):
+                code[pc + 1 + idx] = slots[code[pc + 1 + idx]]
+            pc += 1 + ARITY[op]
+        return code
+
+    def run(self, code_object):
+        frame = self.command.frame
+        code = self.link(code_object)
+        self.execute(code, code_object.consts, ExecutionContext(frame.values, frame.names, self.output,
+                                                                self.command.input_source, self.error_handler,
+                                                                code_object.lines))
+
+    def current_line(self):
+        # The source line of the instruction the innermost execute() is running, for an attached
+        # ErrorCollector. It is only looked up while an error is reported, from execute()'s frame, so
+        # the dispatch loop pays nothing for it. Every instruction moves pc past itself before it can
+        # report an error, so the instruction's last code unit is pc - 1.
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_code is not self.execute.__code__:
+            frame = frame.f_back
+        if frame is None:
+            return None
+        local = frame.f_locals
+        lines = local["context"].lines
+        return None if lines is None else lines[local["pc"] - 1] or None
+
+    def combine(self, cmd, target, left, right, values, error):
+        # Element-wise arithmetic; only reached once an operand has failed the scalar checks
+        if cmd not in arrays.FUNCTIONS:
+            error("E010", op=cmd)
+            return
+        result = arrays.combine(cmd, left, right, error)
+        if result is not None:
+            values[target] = result
+
+    def execute(self, code, consts, context):
+        # Uses no state of the VM besides its constant tables, so it is safe to call from many threads
+        values = context.values
+        names = context.names
+        output = context.output
+        write_line = output.write_line
+        input_source = context.input_source
+        detect_type = self.command.detect_type
+        error = context.error_handler.get_error
+        comparisons = self.COMPARISONS
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        end = len(code)
+        while pc < end:
+            op = code[pc]
+            if op == LOAD_VALUE:
+                value = values[code[pc + 1]]
+                push(consts[code[pc + 2]] if value is UNSET else value)
+                pc += 3
+            elif op == COMPARE:
+                a = values[code[pc + 1]]
+                if a is UNSET:
+                    a = consts[code[pc + 2]]
+                b = values[code[pc + 3]]
+                if b is UNSET:
+                    b = consts[code[pc + 4]]
+                pc += 7
+                if not (isinstance(a, (int, float, bool, str)) and isinstance(b, type(a))):
+                    error("E009")
+                    push(False)
+                else:
+                    compare = comparisons.get(consts[code[pc - 2]])
+                    if compare is None:
+                        error("E012", op=consts[code[pc - 2]])
+                        push(False)
+                    else:
+                        result = compare(a, b)
+                        push(not result if code[pc - 1] else result)
+            elif op == JUMP_IF_FALSE:
+                pc = pc + 2 if pop() else code[pc + 1]
+            elif op == JUMP:
+                pc = code[pc + 1]
+            elif op == ARITH:
+                value = pop()
+                target = code[pc + 2]
+                kind = code[pc + 1]
+                pc += 3
+                current = values[target]
+                if current is UNSET or not isinstance(current, (int, float)):
+                    if type(current) is not Array:
+                        error("E003", var=names[target])
+                    elif not isinstance(value, (int, float, Array)):
+                        error("E002", cmd=ARITH_KINDS[kind], val=value)
+                    else:
+                        self.combine(ARITH_KINDS[kind], target, current, value, values, error)
+                    continue
+                if not isinstance(value, (int, float)):
+                    if type(value) is Array:
+                        self.combine(ARITH_KINDS[kind], target, current, value, values, error)
+                    else:
+                        error("E002", cmd=ARITH_KINDS[kind], val=value)
+                    continue
+                if kind == 0:
+                    values[target] = current + value
+                elif kind == 1:
+                    values[target] = current - value
+                elif kind == 2:
+                    values[target] = current * value
+                elif kind == 3:
+                    if value == 0:
+                        error("E004")
+                        continue
+                    values[target] = current / value
+                else:
+                    values[target] = current % value
+            elif op == STORE:
+                values[code[pc + 1]] = pop()
+                pc += 2
+            elif op == FOR_ITER:
+                value = values[code[pc + 1]]
+                step = consts[code[pc + 3]]
+                limit = consts[code[pc + 2]]
+                if (step > 0 and value <= limit) or (step < 0 and value >= limit):
+                    pc += 5
+                else:
+                    pc = code[pc + 4]
+            elif op == FOR_STEP:
+                values[code[pc + 1]] += consts[code[pc + 2]]
+                pc += 3
+            elif op == LOAD_CONST:
+                push(consts[code[pc + 1]])
+                pc += 2
+            elif op == PRINT:
+                count = code[pc + 1]
+                items = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                write_line(" ".join(str(item) for item in items))
+                pc += 2
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if stack[-1]:
+                    pop()
+                    pc += 2
+                else:
+                    pc = code[pc + 1]
+            elif op == JUMP_IF_TRUE_OR_POP:
+                if stack[-1]:
+                    pc = code[pc + 1]
+                else:
+                    pop()
+                    pc += 2
+            elif op == CLC:
+                target, left, right = code[pc + 1], code[pc + 2], code[pc + 3]
+                kind = code[pc + 4]
+                opname = consts[code[pc + 5]]
+                pc += 6
+                a, b = values[left], values[right]
+                if a is UNSET:
+                    error("E008", var=names[left])
+                    continue
+                if b is UNSET:
+                    error("E008", var=names[right])
+                    continue
+                if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+                    if isinstance(a, (int, float, Array)) and isinstance(b, (int, float, Array)):
+                        self.combine(opname, target, a, b, values, error)
+                    else:
+                        error("E009")
+                    continue
+                if kind == 0:
+                    values[target] = a + b
+                elif kind == 1:
+                    values[target] = a - b
+                elif kind == 2:
+                    values[target] = a * b
+                elif kind == 3:
+                    if b == 0:
+                        error("E004")
+                        continue
+                    values[target] = a / b
+                elif kind == 4:
+                    values[target] = a % b
+                else:
+                    error("E010", op=opname)
+            elif op == LOGIC:
+                target = code[pc + 2]
+                kind = code[pc + 1]
+                value = values[code[pc + 3]]
+                literal = consts[code[pc + 4]]
+                pc += 5
+                current = values[target]
+                if not isinstance(current, bool):
+                    error("E003", var=names[target])
+                    continue
+                if value is UNSET:
+                    if not isinstance(literal, bool):
+                        error("E002", cmd=LOGIC_KINDS[kind], val=literal)
+                        continue
+                    value = literal
+                if kind == 0:
+                    values[target] = current and value
+                elif kind == 1:
+                    values[target] = current or value
+                else:
+                    values[target] = (current and not value) or (not current and value)
+            elif op == NOT:
+                target = code[pc + 1]
+                pc += 2
+                if not isinstance(values[target], bool):
+                    error("E003", var=names[target])
+                    continue
+                values[target] = not values[target]
+            elif op == INPUT:
+                target = code[pc + 1]
+                pc += 2
+                if input_source.interactive:
+                    output.flush()
+                try:
+                    values[target] = input_source.read(names[target], detect_type)
+                except (KeyboardInterrupt, InputExhausted):
+                    error("E005", var=names[target])
+            elif op == FOR_INIT:
+                values[code[pc + 1]] = consts[code[pc + 2]]
+                pc += 3
+            elif op == ERROR:
+                pc += 3
+                error(consts[code[pc - 2]], **dict(consts[code[pc - 1]]))
+            elif op == ARRAY_NEW:
+                target = code[pc + 1]
+                pc += 2
+                init = pop()
+                result = arrays.new(pop(), init, error)
+                if result is not None:
+                    values[target] = result
+            elif op == GET_ITEM:
+                target, source = code[pc + 1], code[pc + 2]
+                pc += 3
+                index = pop()
+                if type(values[source]) is not Array:
+                    error("E028", var=names[source])
+                    continue
+                result = arrays.get(values[source], index, names[source], error)
+                if result is not None:
+                    values[target] = result
+            elif op == PUT_ITEM:
+                target = code[pc + 1]
+                pc += 2
+                value = pop()
+                index = pop()
+                if type(values[target]) is not Array:
+                    error("E028", var=names[target])
+                    continue
+                arrays.put(values[target], index, value, names[target], error)
+            elif op == ARRAY_LEN:
+                target, source = code[pc + 1], code[pc + 2]
+                pc += 3
+                if type(values[source]) is not Array:
+                    error("E028", var=names[source])
+                    continue
+                values[target] = len(values[source])
+            elif op == ARRAY_REDUCE:
+                kind, target, source = code[pc + 1], code[pc + 2], code[pc + 3]
+                pc += 4
+                if type(values[source]) is not Array:
+                    error("E028", var=names[source])
+                    continue
+                result = arrays.reduce(REDUCE_KINDS[kind], values[source], error)
+                if result is not None:
+                    values[target] = result
+            else:
+                raise RuntimeError(f"Unknown opcode {op} at offset {pc}")
@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+
+from PyGenProject.utils.error_codes import GetError  # noqa: E402,F401  (imported first to avoid a cycle)
+from interpreter import PyGenInterpreter  # noqa: E402
+from vm import VirtualMachine  # noqa: E402
+from PyGenProject.utils.inputs import StreamInput, IterableInput  # noqa: E402
+from PyGenProject.utils.output import MemorySink  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from batch import find_programs, find_input  # noqa: E402
+
+
+class GenericForInterpreter(PyGenInterpreter):
+    # Runs every FOR loop through the generic loop: no range-based fast path, no closed form
+    def execute_for(self, node):
+        node.counted = False
+        node.reduction = None
+        super().execute_for(node)
+
+
+ENGINES = {"tree": PyGenInterpreter, "tree-parallel": PyGenInterpreter, "vm": VirtualMachine,
+           "tree-generic-for": GenericForInterpreter}
+WORKERS = {"tree-parallel": 4}  # PARFOR loops run on a process pool; everything else uses one worker
+
+
+def run(program, engine, optimize):
+    input_path = find_input(program)
+    output = MemorySink()
+    options = {} if engine == "vm" else {"workers": WORKERS.get(engine, 1)}
+    interpreter = ENGINES[engine](output, color=False, optimize=optimize, **options,
+                                  input_source=IterableInput(()) if input_path is None else StreamInput(input_path))
+    with open(program) as file:
+        interpreter.run_program(file.read())
+    return output.lines
+
+
+def main():
+    # Every program must print the same with and without the optimizer, on both engines, with
+    # FOR loops on the fast path and on the generic path, and with PARFOR on one worker and on a pool
+    arg_parser = argparse.ArgumentParser(description="Check that optimized programs behave like the originals.")
+    arg_parser.add_argument("programs", nargs="*", default=[os.path.dirname(os.path.abspath(__file__))],
+                            help="program files or directories (default: this corpus)")
+    args = arg_parser.parse_args()
+
+    failures = 0
+    for program in find_programs(args.programs):
+        expected = run(program, "tree", False)
+        failed = [engine for engine in ENGINES if run(program, engine, True) != expected]
+        if run(program, "tree-generic-for", False) != expected:
+            failed.append("tree-generic-for unoptimized")
+        print(f"{'FAIL' if failed else 'ok':<5}{program}" + (f"  ({', '.join(failed)})" if failed else ""))
+        failures += bool(failed)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,200 @@
+import argparse
+import sys
+
 from core.interpreter import PyGenInterpreter
+from core.vm import VirtualMachine
+from core.disassembler import Disassembler
+from core.unparser import Unparser
+from core.cache import ProgramCache
+from core.profiler import Profiler
+from core.budget import Budget
+from core.stream import SourceReader, SourceStream
+from core.diagnostics import ErrorCollector, parse_policy
+from PyGenProject.utils.error_codes import ProgramStopped, ProgramError
+from PyGenProject.utils.inputs import ConsoleInput, StreamInput
 
 
 class Main:
-    def __init__(self, filename):
+    ENGINES = {"tree": PyGenInterpreter, "vm": VirtualMachine}
+
+    def __init__(self, filename, engine="tree", color=True, input_source=None, cache=True, workers=None, optimize=True,
+                 stream=False, error_handler=None):
         self.filename = filename
-        self.interpreter = PyGenInterpreter()
+        self.engine = engine
+        self.optimize = optimize
+        self.stream = stream
+        options = {"workers": workers} if engine == "tree" else {}
+        self.interpreter = self.ENGINES[engine](color=color, input_source=input_source, optimize=optimize,
+                                                error_handler=error_handler, **options)
+        self.cache = ProgramCache() if cache else None
 
     def load_program(self):
         try:
             with open(self.filename, 'r') as file:
-                return file.readlines()
+                return file.read()
         except FileNotFoundError:
             print(f"{self.filename} Not Found")
-            return []
+            return ""
         except Exception as e:
             print(f"Unexpected error: {e}")
-            return []
+            return ""
 
     def run_program(self):
-        lines = self.load_program()
-        if lines:
-            self.interpreter.run_program(lines)
+        if self.stream:
+            self.run_stream()
+            return
+        source = self.load_program()
+        if not source:
+            return
+        if isinstance(self.interpreter.error_handler, ErrorCollector):
+            self.interpreter.error_handler.set_source(source)  # a cached program is not parsed again
+        if self.cache is None:
+            program = self.interpreter.compile_program(source)
+        else:
+            engine = self.engine if self.optimize else f"{self.engine}-unoptimized"
+            program = self.cache.get(self.filename, source, engine, self.interpreter.compile_program)
+        self.interpreter.run_compiled(program)
+
+    def run_stream(self):
+        # Reads, parses and runs the program one top-level piece at a time (tree engine, no cache)
+        try:
+            self.interpreter.run_stream(SourceStream(SourceReader(self.filename), self.interpreter.parser))
+        except FileNotFoundError:
+            print(f"{self.filename} Not Found")
+
+    def tree_interpreter(self):
+        # --check and --dump-optimized work on the AST, which the VM does not keep
+        if isinstance(self.interpreter, PyGenInterpreter):
+            return self.interpreter
+        return PyGenInterpreter(workers=1, optimize=self.optimize)
+
+    def check(self):
+        # Reports the errors the type checker finds before the program runs; returns their number
+        source = self.load_program()
+        if not source:
+            return 0
+        interpreter = self.tree_interpreter()
+        interpreter.parse(source)
+        diagnostics = interpreter.resolver.diagnostics
+        error_handler = self.interpreter.error_handler
+        if isinstance(error_handler, ErrorCollector):
+            error_handler.set_source(source)
+        try:
+            for line, code, kwargs in diagnostics:
+                error_handler.get_error(code, line=line, **kwargs)
+        except ProgramStopped:
+            pass
+        self.interpreter.output.flush()
+        return len(diagnostics)
+
+    def dump_optimized(self):
+        source = self.load_program()
+        if source:
+            interpreter = self.tree_interpreter()
+            print(Unparser().unparse(interpreter.compile_program(source)))
+
+    def disassemble(self):
+        source = self.load_program()
+        if source:
+            vm = self.interpreter if isinstance(self.interpreter, VirtualMachine) else VirtualMachine()
+            print(Disassembler().disassemble(vm.compile(source)))
 
 
 if __name__ == "__main__":
-    runner = Main("user_program.pyg")
-    runner.run_program()
+    arg_parser = argparse.ArgumentParser(description="Run a PyGen program.")
+    arg_parser.add_argument("filename", nargs="?", default="user_program.pyg")
+    arg_parser.add_argument("--engine", choices=sorted(Main.ENGINES), default="tree",
+                            help="tree-walking interpreter (default) or bytecode VM")
+    arg_parser.add_argument("--disassemble", action="store_true",
+                            help="print the compiled bytecode instead of running the program")
+    arg_parser.add_argument("--dump-optimized", action="store_true",
+                            help="print the program as rewritten by the optimizer instead of running it")
+    arg_parser.add_argument("--no-optimize", action="store_true",
+                            help="skip constant folding and dead-branch elimination")
+    arg_parser.add_argument("--no-color", action="store_true",
+                            help="print error messages without ANSI color codes")
+    arg_parser.add_argument("--input", metavar="FILE",
+                            help="read INPUT values from FILE, one per line ('-' for stdin), instead of prompting")
+    arg_parser.add_argument("--no-prompt", action="store_true",
+                            help="read INPUT values from the console without printing prompts")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="read and run the program piece by piece instead of loading it whole (tree engine)")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help="always parse the program instead of using the __pygcache__ directory")
+    arg_parser.add_argument("--workers", type=int, default=None,
+                            help="worker processes for PARFOR loops (default: CPU count; the VM runs them sequentially)")
+    arg_parser.add_argument("--profile", action="store_true",
+                            help="print per-line counts, times and loop iterations to stderr (tree engine)")
+    arg_parser.add_argument("--profile-json", metavar="FILE", help="also write the profile as JSON")
+    arg_parser.add_argument("--profile-collapsed", metavar="FILE",
+                            help="also write the profile as collapsed stacks for flamegraph tools")
+    arg_parser.add_argument("--check", action="store_true",
+                            help="report type and undefined-variable errors before running; do not run if there are any")
+    arg_parser.add_argument("--max-statements", type=int, metavar="N", help="stop the program after N statements (tree engine)")
+    arg_parser.add_argument("--max-iterations", type=int, metavar="N", help="stop the program after N loop iterations")
+    arg_parser.add_argument("--timeout", type=float, metavar="SECONDS", help="stop the program after SECONDS of wall-clock time")
+    arg_parser.add_argument("--max-memory", type=int, metavar="BYTES", help="stop the program once its variables hold more than BYTES")
+    arg_parser.add_argument("--max-errors", type=int, metavar="N",
+                            help="print every distinct error (code and line) once, and at most N of them")
+    arg_parser.add_argument("--on-error", action="append", default=[], metavar="[CLASS=]ACTION",
+                            help="continue, stop or raise on errors of CLASS (arithmetic, math, syntax, ... or a code "
+                                 "such as E004), or on all errors without CLASS; may be repeated")
+    arg_parser.add_argument("--error-summary", metavar="FILE",
+                            help="write the collected errors, with locations and counts, to FILE as JSON")
+    args = arg_parser.parse_args()
+    source = StreamInput(args.input) if args.input else ConsoleInput(prompt=not args.no_prompt)
+    collector = None
+    if args.max_errors is not None or args.on_error or args.error_summary:
+        try:
+            policy, default = parse_policy(args.on_error)
+        except ValueError as error:
+            arg_parser.error(f"--on-error: {error}")
+        collector = ErrorCollector(color=not args.no_color, policy=policy, default=default, max_reports=args.max_errors)
+    runner = Main(args.filename, args.engine, color=not args.no_color, input_source=source,
+                  cache=not args.no_cache, workers=args.workers, optimize=not args.no_optimize, stream=args.stream,
+                  error_handler=collector)
+    if collector is not None:
+        collector.output = runner.interpreter.output
+        collector.attach(runner.interpreter)
+    profiling = args.profile or args.profile_json or args.profile_collapsed
+    if args.stream and args.engine != "tree":
+        arg_parser.error("streaming is only available for the tree engine")
+    if profiling and args.engine != "tree":
+        arg_parser.error("profiling is only available for the tree engine")
+    limits = {"max_statements": args.max_statements, "max_iterations": args.max_iterations,
+              "timeout": args.timeout, "max_memory": args.max_memory}
+    if any(value is not None for value in limits.values()):
+        if args.engine != "tree":
+            arg_parser.error("execution budgets are only available for the tree engine")
+        Budget(**limits).attach(runner.interpreter)
+    status = 0
+    try:
+        if args.disassemble:
+            runner.disassemble()
+        elif args.dump_optimized:
+            runner.dump_optimized()
+        elif args.check and runner.check():
+            status = 1
+        elif profiling:
+            profiler = Profiler().attach(runner.interpreter)
+            runner.run_program()
+            if args.profile:
+                print(profiler.report(), file=sys.stderr)
+            if args.profile_json:
+                with open(args.profile_json, "w") as file:
+                    file.write(profiler.to_json())
+            if args.profile_collapsed:
+                with open(args.profile_collapsed, "w") as file:
+                    file.write(profiler.collapsed() + "\n")
+        else:
+            runner.run_program()
+    except ProgramError:
+        status = 1  # the error has been reported; the policy asked for a failing exit status
+    if collector is not None:
+        for line in collector.report():
+            runner.interpreter.output.write_line(line)
+        runner.interpreter.output.flush()
+        if args.error_summary:
+            with open(args.error_summary, "w") as file:
+                file.write(collector.to_json() + "\n")
+    sys.exit(status)
@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from batch import BatchRunner, OK, REPORTED_ERRORS  # noqa: E402
+
+
+def report(tmp_path, source, **options):
+    program = tmp_path / "program.pyg"
+    program.write_text(source)
+    return next(BatchRunner(workers=1, cache=False, **options).run([str(program)]))
+
+
+def test_raise_policy_counts_as_reported_errors(tmp_path):
+    entry = report(tmp_path, 'PRINT "before"\nDIV x 0\nPRINT "after"\n', default="raise")
+    assert entry["status"] == REPORTED_ERRORS
+    assert "exception" not in entry
+    assert entry["stdout"].startswith("before\n")
+    assert "after" not in entry["stdout"]
+
+
+def test_program_without_errors_is_ok(tmp_path):
+    assert report(tmp_path, 'PRINT "fine"\n')["status"] == OK
+
+
+def test_vm_errors_are_reported_with_their_line(tmp_path):
+    entry = report(tmp_path, 'SET s "x"\nSET n 1\nADD n s\n', engine="vm")
+    assert entry["status"] == REPORTED_ERRORS
+    assert entry["stdout"].startswith("Line 3: ")
@@ -0,0 +1,97 @@
+from interpreter import PyGenInterpreter
+from budget import Budget
+from profiler import Profiler
+from PyGenProject.utils.output import MemorySink
+
+PRODUCT_FOR = """
+SET p 3
+FOR i FROM 1 TO 30000000 DO
+    MUL p 3
+ENDFOR
+PRINT "done"
+"""
+
+PRODUCT_WHILE = """
+SET p 3
+SET i 0
+WHILE i < 30000000 DO
+    ADD i 1
+    MUL p 3
+ENDWHILE
+PRINT "done"
+"""
+
+SUM_FOR = """
+SET s 0
+FOR i FROM 1 TO 1000000000 DO
+    ADD s i
+ENDFOR
+PRINT s i
+"""
+
+
+def run(source, **limits):
+    output = MemorySink()
+    interpreter = PyGenInterpreter(output, color=False, workers=1)
+    budget = Budget(**limits).attach(interpreter)
+    interpreter.run_program(source)
+    return output.lines, budget
+
+
+def test_closed_form_product_does_not_overrun_statement_budget():
+    lines, budget = run(PRODUCT_FOR, max_statements=1000, timeout=60)
+    assert lines == ["Limit Error: Program exceeded its statement budget of 1000 and was stopped."]
+    # Charged block by block up to the limit, not for the 30 million iterations of a closed form
+    assert (budget.statements, budget.iterations) == (1001, 998)
+
+
+def test_closed_form_product_does_not_overrun_timeout():
+    lines, budget = run(PRODUCT_WHILE, timeout=0.5, check_every=64)
+    assert lines == ["Limit Error: Program exceeded its time budget of 0.5s and was stopped."]
+    # Stopped by a clock check between iterations, not after a closed form of all of them
+    assert budget.iterations < 30000000
+    assert budget.statements == 4 + 2 * budget.iterations
+
+
+def test_constant_time_closed_form_still_runs_under_timeout():
+    lines, budget = run(SUM_FOR, timeout=60, max_iterations=10 ** 9)
+    assert lines == ["500000000500000000 1000000001"]
+    assert budget.iterations == 10 ** 9
+
+
+COUNTED_FOR = """
+FOR i FROM 1 TO 100 DO
+    PRINT i
+ENDFOR
+"""
+
+COUNTED_WHILE = """
+SET i 0
+WHILE i < 100 DO
+    ADD i 1
+ENDWHILE
+PRINT i
+"""
+
+
+def test_detaching_budget_keeps_profiler_attached():
+    output = MemorySink()
+    interpreter = PyGenInterpreter(output, color=False, workers=1)
+    profiler = Profiler().attach(interpreter)
+    counted_block = interpreter.execute_block
+    Budget(max_statements=10).attach(interpreter).detach()
+    assert interpreter.execute_block is counted_block
+    interpreter.run_program(COUNTED_FOR)
+    assert len(output.lines) == 100
+    assert profiler.stats[3].count == 100
+    profiler.detach()
+    assert "execute_block" not in vars(interpreter)
+
+
+def test_detaching_profiler_keeps_budget_attached():
+    output = MemorySink()
+    interpreter = PyGenInterpreter(output, color=False, workers=1)
+    Budget(max_statements=10).attach(interpreter)
+    Profiler().attach(interpreter).detach()
+    interpreter.run_program(COUNTED_WHILE)
+    assert output.lines == ["Limit Error: Program exceeded its statement budget of 10 and was stopped."]
@@ -0,0 +1,31 @@
+from cache import ProgramCache
+
+
+class Program:
+    # Counts how often a cached program is deserialized
+    loads = 0
+
+    def __init__(self, source):
+        self.source = source
+
+    def __setstate__(self, state):
+        Program.loads += 1
+        self.__dict__.update(state)
+
+
+def test_stale_entry_is_rejected_without_loading_the_program(tmp_path):
+    filename = str(tmp_path / "program.pyg")
+    cache = ProgramCache()
+    cache.get(filename, "PRINT 1", "tree", Program)
+    Program.loads = 0
+
+    rebuilt = cache.get(filename, "PRINT 2", "tree", Program)
+    assert rebuilt.source == "PRINT 2"
+    assert Program.loads == 0
+
+    foreign = ProgramCache(version="other")
+    assert foreign.load(cache.path(filename, "tree"), foreign.key("PRINT 2", "tree")) is None
+    assert Program.loads == 0
+
+    assert cache.get(filename, "PRINT 2", "tree", Program).source == "PRINT 2"
+    assert Program.loads == 1
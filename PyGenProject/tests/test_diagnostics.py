@@ -0,0 +1,88 @@
+import asyncio
+
+from interpreter import PyGenInterpreter
+from async_interpreter import AsyncPyGenInterpreter
+from budget import Budget
+from diagnostics import ErrorCollector
+from stream import SourceReader, SourceStream
+from vm import VirtualMachine
+from PyGenProject.utils.output import MemorySink, ForwardingSink
+
+LOOP = """
+SET n 0
+WHILE n < 1000 DO
+    ADD n 1
+    PRINT n
+ENDWHILE
+PRINT "unreachable"
+"""
+EXCEEDED = "Limit Error: Program exceeded its statement budget of 5 and was stopped."
+
+
+def limited(interpreter_type, forward=False, **options):
+    # An interpreter that stops after 5 statements and on any error; `forward` wraps the output in
+    # the async sink the async interpreter needs
+    output = MemorySink()
+    collector = ErrorCollector(output, color=False, default="stop")
+    sink = ForwardingSink(output) if forward else output
+    interpreter = interpreter_type(sink, color=False, error_handler=collector, **options)
+    Budget(max_statements=5).attach(interpreter)
+    return interpreter, collector, output
+
+
+def test_budget_with_stop_policy_stops_tree_run():
+    interpreter, collector, output = limited(PyGenInterpreter, workers=1)
+    interpreter.run_program(LOOP)
+    assert output.lines == ["1", EXCEEDED]
+    assert [diagnostic.code for diagnostic in collector.diagnostics.values()] == ["E025"]
+
+
+def test_budget_with_stop_policy_stops_streamed_run(tmp_path):
+    path = tmp_path / "loop.pyg"
+    path.write_text(LOOP)
+    interpreter, collector, output = limited(PyGenInterpreter, workers=1)
+    interpreter.run_stream(SourceStream(SourceReader(str(path)), interpreter.parser))
+    assert output.lines == ["1", EXCEEDED]
+
+
+def test_budget_with_stop_policy_stops_async_run():
+    interpreter, collector, output = limited(AsyncPyGenInterpreter, forward=True)
+    asyncio.run(interpreter.run(LOOP))
+    assert output.lines == ["1", EXCEEDED]
+
+
+ERRORS = """
+SET a 1
+SET s "x"
+SET n 0
+WHILE n < 3 DO
+    ADD n 1
+    IF s == a THEN
+        PRINT a
+    ENDIF
+    ADD a s
+ENDWHILE
+"""
+
+
+def located(collector):
+    return [(diagnostic.code, diagnostic.line, diagnostic.count) for diagnostic in collector.diagnostics.values()]
+
+
+def test_vm_errors_have_lines():
+    output = MemorySink()
+    collector = ErrorCollector(output, color=False)
+    vm = VirtualMachine(output, color=False, error_handler=collector)
+    collector.attach(vm)
+    vm.run_program(ERRORS)
+    assert located(collector) == [("E009", 7, 3), ("E002", 10, 3)]
+    assert output.lines[0].startswith("Line 7: ")
+
+
+def test_async_errors_have_lines():
+    output = MemorySink()
+    collector = ErrorCollector(output, color=False)
+    interpreter = AsyncPyGenInterpreter(ForwardingSink(output), color=False, error_handler=collector)
+    collector.attach(interpreter)
+    asyncio.run(interpreter.run(ERRORS))
+    assert located(collector) == [("E009", 7, 3), ("E002", 10, 3)]
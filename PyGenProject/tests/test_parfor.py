@@ -0,0 +1,79 @@
+import pytest
+
+from interpreter import PyGenInterpreter
+from PyGenProject.utils.output import MemorySink
+
+INVALID = "Syntax Error: Invalid PARFOR syntax."
+
+
+def run(source):
+    output = MemorySink()
+    PyGenInterpreter(output, color=False, workers=1).run_program(source)
+    return output.lines
+
+
+@pytest.mark.parametrize("header", [
+    "PARFOR i FROM 1 TO 5",
+    "PARFOR i FROM 1 TO DO",
+    "PARFOR i FROM 1 UPTO 5 DO",
+    "PARFOR i FROM 1 TO 5 STEP DO",
+    "PARFOR i FROM 1 TO 5 STEP 0 DO",
+    "PARFOR i FROM 1 TO 5 STEP 1.5 DO",
+    "PARFOR i FROM 1 TO 5 STEP 1 STEP 1 DO",
+    "PARFOR i FROM 1 TO 5 REDUCE DO",
+    "PARFOR i FROM 1 TO 5 REDUCE ADD DO",
+    "PARFOR i FROM 1 TO 5 REDUCE DIV total DO",
+    "PARFOR i FROM 1 TO 5 REDUCE ADD i DO",
+    "PARFOR i FROM 1 TO 5 STEP REDUCE ADD total DO",
+])
+def test_malformed_header_reports_e021(header):
+    lines = run(f"SET total 0\n{header}\n    ADD total 1\nENDPARFOR\nPRINT \"after\"\n")
+    assert lines[0].startswith(INVALID)
+    assert lines[1:] == ["after"]
+
+
+
+SHARED = "Parallel Error: Variable 'q' is shared between PARFOR iterations."
+
+
+@pytest.mark.parametrize("definition", [
+    "CLC q i DIV zero",
+    "GET q values i",
+    "LEN q values",
+    "SUM q values",
+    "ARRAY q i 0",
+    "SET q",
+])
+def test_private_defined_by_a_statement_that_can_fail_is_rejected(definition):
+    # These leave q unchanged when they fail, so an iteration could see, and leave behind, the
+    # value of an iteration in another chunk
+    source = f"SET zero 0\nARRAY values 4 1\nPARFOR i FROM 0 TO 3 DO\n    {definition}\n    PRINT q\nENDPARFOR\n"
+    lines = run(source)
+    assert len(lines) == 1 and lines[0].startswith(f"Line 4: {SHARED}")
+
+
+def test_private_defined_by_set_matches_sequential_result():
+    source = """
+SET zero 0
+SET two 2
+PARFOR i FROM 1 TO 40 DO
+    SET q i
+    ARRAY row 3 0
+    PUT row 0 i
+    IF i > 30 THEN
+        DIV q zero
+        GET q row 5
+    ENDIF
+    CLC q q MUL two
+    PRINT i q
+ENDPARFOR
+PRINT "q" q "row" row "i" i
+"""
+    sequential = MemorySink()
+    PyGenInterpreter(sequential, color=False, workers=1).run_program(source)
+    parallel = MemorySink()
+    interpreter = PyGenInterpreter(parallel, color=False, workers=4)
+    interpreter.run_program(source)
+    interpreter.parallel.close()
+    assert parallel.lines == sequential.lines
+    assert sequential.lines[-1] == "q 80 row [40, 0, 0] i 41"
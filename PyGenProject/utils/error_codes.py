@@ -1,3 +1,26 @@
+class BudgetExceeded(Exception):
+    # Raised when a program runs past one of its execution budgets; interpreters report it as E025
+    def __init__(self, limit, value):
+        super().__init__(limit, value)
+        self.limit = limit  # "statement", "iteration", "time" or "memory"
+        self.value = value
+
+
+class ProgramStopped(Exception):
+    # Raised by an ErrorCollector whose policy stops the program on an error; interpreters end the
+    # run quietly, since the error has already been reported
+    def __init__(self, diagnostic):
+        super().__init__(diagnostic)
+        self.diagnostic = diagnostic
+
+
+class ProgramError(Exception):
+    # Raised by an ErrorCollector whose policy raises on an error; it reaches the caller of the run
+    def __init__(self, diagnostic):
+        super().__init__(str(diagnostic))
+        self.diagnostic = diagnostic
+
+
 class GetError:
     ERROR_CODES = {
         "E001": "Syntax Error: Command '{cmd}' is unknown.",
@@ -19,12 +42,42 @@ class GetError:
         "E017": "Syntax Error: Missing ENDWHILE for WHILE statement.",
         "E018": "Syntax Error: Invalid FOR syntax. Expected: FOR <var> FROM <start> TO <end> [STEP <step>] DO",
         "E019": "Arithmetic Error: Non-numeric values in FOR loop parameters.",
-        "E020": "Syntax Error: Missing ENDFOR for FOR statement."
+        "E020": "Syntax Error: Missing ENDFOR for FOR statement.",
+        "E021": "Syntax Error: Invalid PARFOR syntax. Expected: PARFOR <var> FROM <int> TO <int> [STEP <int>] [REDUCE <ADD|MUL|AND|OR> <var> ...] DO",
+        "E022": "Syntax Error: Missing ENDPARFOR for PARFOR statement.",
+        "E023": "Parallel Error: Variable '{var}' is shared between PARFOR iterations. Declare it with REDUCE or assign it with SET or ARRAY before any use.",
+        "E024": "Parallel Error: INPUT is not allowed inside PARFOR.",
+        "E025": "Limit Error: Program exceeded its {limit} budget of {value} and was stopped.",
+        "E026": "Array Error: ARRAY needs a non-negative integer size and a numeric initial value.",
+        "E027": "Array Error: Invalid index '{index}' for array '{var}'.",
+        "E028": "Array Error: Variable '{var}' is not an array.",
+        "E029": "Array Error: Arrays of different lengths in {cmd}.",
+        "E030": "Array Error: Value '{val}' does not fit in array '{var}'.",
+        "E031": "Array Error: Result of {cmd} is out of range for an integer array.",
+        "E032": "Array Error: {cmd} of an empty array."
     }
 
     RED = "\033[91m"
     RESET = "\033[0m"
 
-    def get_error(self, code, **kwargs):
-        message = self.ERROR_CODES.get(code, "Unknown Error: Code '{code}' not defined.")
-        print(f"{self.RED}{message.format(**kwargs)}{self.RESET}")
+    def __init__(self, output=None, color=True):
+        # output is an OutputSink; without one, messages are printed directly
+        self.output = output
+        self.color = color
+
+    def message(self, code, **kwargs):
+        return self.ERROR_CODES.get(code, "Unknown Error: Code '{code}' not defined.").format(code=code, **kwargs)
+
+    def get_error(self, code, line=None, **kwargs):
+        # `line` is given for errors found before the program runs
+        message = self.message(code, **kwargs)
+        if line is not None:
+            message = f"Line {line}: {message}"
+        self.write(message)
+
+    def write(self, message):
+        text = f"{self.RED}{message}{self.RESET}" if self.color else message
+        if self.output is None:
+            print(text)
+        else:
+            self.output.write_line(text)
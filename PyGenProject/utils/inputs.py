@@ -0,0 +1,94 @@
+import sys
+
+
+class InputExhausted(Exception):
+    pass
+
+
+class InputSource:
+    # Supplies the values read by INPUT. read() returns the typed value for one variable and raises
+    # InputExhausted when the source has nothing left for it.
+    interactive = False
+
+    def read(self, name, detect_type):
+        raise NotImplementedError
+
+
+class ConsoleInput(InputSource):
+    interactive = True
+
+    def __init__(self, prompt=True):
+        self.prompt = prompt
+
+    def read(self, name, detect_type):
+        return detect_type(input(f"{name} = ") if self.prompt else input())
+
+
+class StreamInput(InputSource):
+    # Reads a whole file or stream at once, one value per line, and parses every line in a single
+    # pass on the first INPUT. A path of "-" means standard input.
+    def __init__(self, source, encoding="utf-8"):
+        self.source = source
+        self.encoding = encoding
+        self.values = None
+
+    def load(self, detect_type):
+        if isinstance(self.source, str):
+            if self.source == "-":
+                text = sys.stdin.read()
+            else:
+                with open(self.source, encoding=self.encoding) as file:
+                    text = file.read()
+        else:
+            text = self.source.read()
+        return iter(list(map(detect_type, text.splitlines())))
+
+    def read(self, name, detect_type):
+        if self.values is None:
+            self.values = self.load(detect_type)
+        for value in self.values:
+            return value
+        raise InputExhausted(name)
+
+
+class IterableInput(InputSource):
+    # Strings are parsed like typed input; any other item is used as it is
+    def __init__(self, iterable):
+        self.items = iter(iterable)
+
+    def read(self, name, detect_type):
+        for item in self.items:
+            return detect_type(item) if isinstance(item, str) else item
+        raise InputExhausted(name)
+
+
+class MappingInput(InputSource):
+    # Pre-bound values by variable name; names that are not bound are read from `fallback`
+    def __init__(self, mapping, fallback=None):
+        self.mapping = mapping
+        self.fallback = fallback
+        self.parsed = {}
+
+    def read(self, name, detect_type):
+        if name in self.parsed:
+            return self.parsed[name]
+        if name in self.mapping:
+            value = self.mapping[name]
+            value = self.parsed[name] = detect_type(value) if isinstance(value, str) else value
+            return value
+        if self.fallback is not None:
+            return self.fallback.read(name, detect_type)
+        raise InputExhausted(name)
+
+
+class QueueInput(InputSource):
+    # Awaits one value per INPUT from an asyncio.Queue; a None item ends the input
+    def __init__(self, queue, prompt=True):
+        self.queue = queue
+        self.prompt = prompt
+
+    async def read(self, name, detect_type):
+        item = await self.queue.get()
+        if item is None:
+            raise InputExhausted(name)
+        return detect_type(item) if isinstance(item, str) else item
@@ -0,0 +1,153 @@
+import os
+import sys
+
+
+class OutputSink:
+    # Destination for everything a program prints: PRINT output and error messages
+    def write_line(self, text):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class MemorySink(OutputSink):
+    def __init__(self):
+        self.lines = []
+
+    def write_line(self, text):
+        self.lines.append(text)
+
+    def getvalue(self):
+        return "".join(line + "\n" for line in self.lines)
+
+    def clear(self):
+        self.lines.clear()
+
+
+class BufferedWriter(OutputSink):
+    # Flush policies: "line" writes every line at once, "size" writes whenever buffer_size characters
+    # are pending, "close" writes only on flush() or close()
+    FLUSH_POLICIES = ("line", "size", "close")
+
+    def __init__(self, stream, flush_policy="size", buffer_size=65536):
+        if flush_policy not in self.FLUSH_POLICIES:
+            raise ValueError(f"Unknown flush policy '{flush_policy}'")
+        self.stream = stream
+        self.flush_policy = flush_policy
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.pending = 0
+
+    def write_line(self, text):
+        self.buffer.append(text)
+        self.buffer.append("\n")
+        if self.flush_policy == "line":
+            self.flush()
+        elif self.flush_policy == "size":
+            self.pending += len(text) + 1
+            if self.pending >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        if self.buffer:
+            stream = self.get_stream()
+            stream.write("".join(self.buffer))
+            stream.flush()
+            self.buffer.clear()
+            self.pending = 0
+
+    def get_stream(self):
+        return self.stream
+
+
+class StdoutSink(BufferedWriter):
+    # Looks up sys.stdout on every flush, so redirecting stdout still works. Without an explicit
+    # policy, a terminal is flushed line by line and anything else in large blocks.
+    def __init__(self, flush_policy=None, buffer_size=65536):
+        if flush_policy is None:
+            flush_policy = "line" if sys.stdout.isatty() else "size"
+        super().__init__(None, flush_policy, buffer_size)
+
+    def get_stream(self):
+        return sys.stdout
+
+
+class FileSink(BufferedWriter):
+    # Writes to a file path or to an already open file descriptor, which is left open on close()
+    def __init__(self, target, flush_policy="size", buffer_size=65536, encoding="utf-8"):
+        if isinstance(target, int):
+            stream = os.fdopen(target, "w", encoding=encoding, closefd=False)
+        else:
+            stream = open(target, "w", encoding=encoding)
+        super().__init__(stream, flush_policy, buffer_size)
+
+    def close(self):
+        self.flush()
+        self.stream.close()
+
+
+class AsyncSink(OutputSink):
+    # Output for AsyncPyGenInterpreter. Lines are collected synchronously, so PRINT and error
+    # reporting stay unchanged, and are handed to deliver() when the interpreter awaits drain().
+    def __init__(self):
+        self.pending = []
+
+    def write_line(self, text):
+        self.pending.append(text)
+
+    async def drain(self):
+        if self.pending:
+            lines, self.pending = self.pending, []
+            await self.deliver(lines)
+
+    async def deliver(self, lines):
+        raise NotImplementedError
+
+
+class QueueSink(AsyncSink):
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+
+    async def deliver(self, lines):
+        for line in lines:
+            await self.queue.put(line)
+
+
+class ForwardingSink(AsyncSink):
+    # Writes straight through to an ordinary OutputSink, so drain() never suspends and an async
+    # interpreter can also be driven step by step without an event loop
+    def __init__(self, sink):
+        super().__init__()
+        self.sink = sink
+
+    def write_line(self, text):
+        self.sink.write_line(text)
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        self.sink.close()
+
+
+class StreamWriterSink(AsyncSink):
+    # Writes to an asyncio StreamWriter and waits for its buffer to drain
+    def __init__(self, writer, encoding="utf-8"):
+        super().__init__()
+        self.writer = writer
+        self.encoding = encoding
+
+    async def deliver(self, lines):
+        self.writer.write("".join(line + "\n" for line in lines).encode(self.encoding))
+        await self.writer.drain()
+
+
+class AsyncStdoutSink(AsyncSink):
+    async def deliver(self, lines):
+        sys.stdout.write("".join(line + "\n" for line in lines))
+        sys.stdout.flush()